@@ -0,0 +1,127 @@
+"""
+Arquivo: export_fretboard_onnx.py
+
+Objetivo:
+Exportar o modelo YOLO do braço (models/fretboard_yolo.pt) para ONNX
+e, opcionalmente, quantizá-lo em int8 para inferência em CPU
+(backend "onnx" em src/video/video_analysis/fretboard_detectors.py).
+
+Saídas:
+- models/fretboard_yolo.onnx          (float32)
+- models/fretboard_yolo.int8-dyn.onnx (quantização dinâmica)
+- models/fretboard_yolo.int8.onnx     (quantização estática, calibrada em val/)
+
+Comparação de latência e mAP com o PyTorch:
+src/video/video_analysis/detector_eval.py (compare_onnx_with_pytorch)
+"""
+
+import os
+import shutil
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+
+DATASET_DIR = os.path.dirname(os.path.abspath(__file__))
+CALIB_DIR = os.path.join(DATASET_DIR, "val", "images")
+OUTPUT_DIR = "models"
+IMGSZ = 640
+
+
+def letterbox_blob(img, size=IMGSZ):
+    # Mesmo pré-processamento do OnnxDetector (letterbox 114, RGB, /255)
+    h, w = img.shape[:2]
+    r = min(size / h, size / w)
+    nh, nw = int(round(h * r)), int(round(w * r))
+
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(img, (nw, nh))
+
+    return canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+
+
+def export_onnx(weights=os.path.join(OUTPUT_DIR, "fretboard_yolo.pt"), imgsz=IMGSZ):
+    # --------------------------------------------------
+    # Exportação (batch dinâmico para inferência em lote)
+    # --------------------------------------------------
+    model = YOLO(weights)
+    path = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+
+    out = os.path.join(OUTPUT_DIR, "fretboard_yolo.onnx")
+    if os.path.abspath(path) != os.path.abspath(out):
+        shutil.move(path, out)
+
+    print(f"✅ ONNX salvo em: {out}")
+    return out
+
+
+def quantize_dynamic_int8(onnx_path):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    out = onnx_path.replace(".onnx", ".int8-dyn.onnx")
+    quantize_dynamic(onnx_path, out, weight_type=QuantType.QUInt8)
+
+    print(f"✅ Quantização dinâmica salva em: {out}")
+    return out
+
+
+def quantize_static_int8(onnx_path, calib_dir=CALIB_DIR, imgsz=IMGSZ, max_images=100):
+    from onnxruntime.quantization import (
+        quantize_static, CalibrationDataReader, QuantFormat, QuantType
+    )
+    import onnxruntime as ort
+
+    input_name = ort.InferenceSession(
+        onnx_path, providers=["CPUExecutionProvider"]
+    ).get_inputs()[0].name
+
+    class ValImagesReader(CalibrationDataReader):
+        def __init__(self):
+            files = sorted(
+                f for f in os.listdir(calib_dir)
+                if f.lower().endswith((".jpg", ".jpeg", ".png"))
+            )[:max_images]
+            self._files = iter(files)
+
+        def get_next(self):
+            for f in self._files:
+                img = cv2.imread(os.path.join(calib_dir, f))
+                if img is not None:
+                    return {input_name: letterbox_blob(img, imgsz)}
+            return None
+
+    out = onnx_path.replace(".onnx", ".int8.onnx")
+    quantize_static(
+        onnx_path,
+        out,
+        ValImagesReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+
+    print(f"✅ Quantização estática (calibrada em {calib_dir}) salva em: {out}")
+    return out
+
+
+def export_fretboard_onnx(quantize="static"):
+    """
+    quantize: None, "dynamic", "static" ou "both"
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    onnx_path = export_onnx()
+
+    outputs = [onnx_path]
+    if quantize in ("dynamic", "both"):
+        outputs.append(quantize_dynamic_int8(onnx_path))
+    if quantize in ("static", "both"):
+        outputs.append(quantize_static_int8(onnx_path))
+
+    return outputs
+
+
+if __name__ == "__main__":
+    export_fretboard_onnx(quantize="both")
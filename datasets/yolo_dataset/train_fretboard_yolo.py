@@ -14,7 +14,15 @@ from ultralytics import YOLO
 import os
 
 
-def train_fretboard_yolo():
+def default_device():
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        return "cpu"
+
+
+def train_fretboard_yolo(device=None):
     # --------------------------------------------------
     # Caminhos principais
     # --------------------------------------------------
@@ -37,7 +45,7 @@ def train_fretboard_yolo():
         epochs=100,          # ajuste conforme dataset
         imgsz=640,
         batch=8,
-        device="cuda",       # ou "cpu"
+        device=device or default_device(),  # "cuda" se disponível
         project=OUTPUT_DIR,
         name="fretboard_yolo",
         exist_ok=True
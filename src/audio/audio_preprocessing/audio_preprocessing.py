@@ -22,13 +22,22 @@ def highpass_filter(data, cutoff, sr, order=2):
 def preprocess_audio(
     audio_path="data/raw/audio/audio_raw.wav",
     output_path="data/processed/audio/audio_clean.wav",
-    show_plots=False
+    show_plots=False,
+    y=None,
+    sr=44100
 ):
-    if not os.path.exists(audio_path):
-        raise FileNotFoundError(f"Áudio não encontrado: {audio_path}")
+    """
+    - y=None: carrega e reamostra audio_path com librosa
+    - y=buffer float32 mono já em `sr` (ex.: demux_audio_video): sem releitura do WAV
+    """
+    if y is None:
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"Áudio não encontrado: {audio_path}")
 
-    print("🔊 Carregando áudio...")
-    y, sr = librosa.load(audio_path, sr=44100)
+        print("🔊 Carregando áudio...")
+        y, sr = librosa.load(audio_path, sr=sr)
+    else:
+        print("🔊 Usando áudio em memória...")
 
     print("🎛️ High-pass leve (50 Hz)...")
     y_hp = highpass_filter(y, cutoff=50, sr=sr)
@@ -4,52 +4,260 @@ Função: Receber um vídeo de entrada, extrair os frames e o áudio separadamen
 Entradas:
   - Caminho do vídeo: data/raw/video_original.mp4
 Saídas:
-  - Frames extraídos: data/raw/frames/frame_XXXX.jpg
+  - Frames extraídos (opcional): data/raw/frames/frame_XXXX.jpg
+    ou um frame store em chunks (frame_store.py)
   - Áudio extraído: data/raw/audio/audio_raw.wav
+
+Para processar os frames sem gravá-los em disco, use
+frame_source.iter_video_frames diretamente.
+
+demux_audio_video faz a extração em uma única passada (um só ffmpeg
+lê áudio e vídeo do contêiner) e devolve o áudio em memória (float32,
+mono); extract_video_and_frames a usa no modo sequencial.
 """
 
 import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+
+import numpy as np
+import soundfile as sf
 from moviepy import VideoFileClip
 import cv2
 from tqdm import tqdm
 
-def extract_video_and_frames(video_path: str):
+from frame_source import video_info
+from frame_store import FrameStoreWriter
+from parallel_decode import iter_video_frames_parallel
+
+FRAME_DIR = "data/raw/frames"
+
+
+def extract_video_and_frames(
+    video_path: str,
+    save_frames: bool = True,
+    store_dir: str = None,
+    workers: int = 1
+):
     # --- Configurações de diretórios ---
     os.makedirs("data/raw/audio", exist_ok=True)
-    os.makedirs("data/raw/frames", exist_ok=True)
 
     # --- Verifica o arquivo ---
     if not os.path.exists(video_path):
         raise FileNotFoundError(f"Arquivo não encontrado: {video_path}")
     
+    audio_output = "data/raw/audio/audio_raw.wav"
+    frame_count = video_info(video_path)["frame_count"]
+
+    # --- Passada única (áudio + frames) no modo sequencial ---
+    # O modo paralelo mantém a extração separada: cada processo de
+    # decodificação precisa do próprio acesso ao contêiner.
+    if workers <= 1 and (save_frames or store_dir is not None):
+        if store_dir is None:
+            os.makedirs(FRAME_DIR, exist_ok=True)
+
+        progress = tqdm(total=frame_count)
+
+        def on_frame(index, _, frame):
+            if store_dir is None:
+                cv2.imwrite(os.path.join(FRAME_DIR, f"frame_{index:05d}.jpg"), frame)
+            progress.update(1)
+
+        try:
+            result = demux_audio_video(
+                video_path, on_frame=on_frame, audio_output=audio_output, store_dir=store_dir
+            )
+        finally:
+            progress.close()
+
+        print(f"✅ {result['frame_count']} frames salvos em: {store_dir or FRAME_DIR}")
+        return
+
     # --- Extrai áudio ---
     print("🎵 Extraindo áudio do vídeo...")
     video = VideoFileClip(video_path)
     audio = video.audio
-    audio_output = "data/raw/audio/audio_raw.wav"
     audio.write_audiofile(audio_output, codec='pcm_s16le')
     print(f"✅ Áudio salvo em: {audio_output}")
 
+    if not save_frames and store_dir is None:
+        print("ℹ️ Frames não serão salvos (use iter_video_frames para streaming)")
+        return
+
+    # --- Decodificação paralela (por segmentos) ---
+    frames = iter_video_frames_parallel(video_path, workers=workers)
+
+    # --- Extrai frames para o frame store (chunks .npy) ---
+    if store_dir is not None:
+        print("🎞️ Extraindo frames para o frame store...")
+        with FrameStoreWriter(store_dir) as store:
+            for index, timestamp, frame in tqdm(frames, total=frame_count):
+                store.append(index, timestamp, frame)
+
+        print(f"✅ {len(store.index)} frames salvos em: {store_dir}")
+        return
+
     # --- Extrai frames ---
     print("🎞️ Extraindo frames...")
-    cap = cv2.VideoCapture(video_path)
-    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    os.makedirs(FRAME_DIR, exist_ok=True)
 
-    frame_dir = "data/raw/frames"
     count = 0
-    success = True
-
-    for i in tqdm(range(frame_count)):
-        success, frame = cap.read()
-        if not success:
-            break
-        frame_name = os.path.join(frame_dir, f"frame_{count:05d}.jpg")
+    for index, _, frame in tqdm(frames, total=frame_count):
+        frame_name = os.path.join(FRAME_DIR, f"frame_{index:05d}.jpg")
         cv2.imwrite(frame_name, frame)
         count += 1
-    
-    cap.release()
-    print(f"✅ {count} frames salvos em: {frame_dir}")
+
+    print(f"✅ {count} frames salvos em: {FRAME_DIR}")
+
+
+def _ffmpeg_exe():
+    # Binário do imageio-ffmpeg, já instalado como dependência do moviepy
+    from imageio_ffmpeg import get_ffmpeg_exe
+    return get_ffmpeg_exe()
+
+
+def _demux_process(video_path, sr, audio_raw_path):
+    """
+    Um único ffmpeg lê o contêiner uma vez: vídeo em BGR cru no stdout,
+    áudio mono float32 em `sr` no arquivo temporário.
+    """
+    cmd = [
+        # -noautorotate: dimensões iguais às de video_info (sem rotação)
+        _ffmpeg_exe(), "-v", "error", "-nostdin", "-noautorotate", "-i", video_path,
+        "-map", "0:v:0", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
+        "-map", "0:a:0?", "-f", "f32le", "-ac", "1", "-ar", str(sr), "-y", audio_raw_path,
+    ]
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def demux_audio_video(
+    video_path: str,
+    on_frame=None,
+    sr: int = 44100,
+    audio_output: str = None,
+    store_dir: str = None,
+    queue_size: int = 64
+):
+    """
+    Extração em passada única: um só processo ffmpeg abre o contêiner e
+    decodifica áudio e vídeo juntos (o cv2 só lê os metadados).
+      - thread de vídeo: lê os frames do pipe e os coloca numa fila limitada
+      - thread principal: entrega cada frame a on_frame(index, timestamp, frame)
+        e/ou ao frame store
+      - o áudio (float32 mono em `sr`) é lido ao fim, do arquivo temporário
+
+    Se on_frame falhar, o produtor é interrompido, a fila é drenada e o
+    ffmpeg encerrado antes de a exceção subir.
+
+    O WAV só é gravado se audio_output for informado.
+    Retorna {"audio": np.ndarray, "sr": int, "frame_count": int}, pronto para
+    preprocess_audio(y=..., sr=...).
+    """
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Arquivo não encontrado: {video_path}")
+
+    print("🎬 Extraindo áudio e frames em uma única passada...")
+
+    info = video_info(video_path)
+    w, h, fps = info["width"], info["height"], info["fps"]
+    frame_bytes = w * h * 3
+
+    tmp_dir = tempfile.mkdtemp(prefix="demux_")
+    audio_raw_path = os.path.join(tmp_dir, "audio.f32")
+    proc = _demux_process(video_path, sr, audio_raw_path)
+
+    # --- Produtor de frames (fila limitada = memória constante) ---
+    frames_q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                frames_q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            index = 0
+            while not stop.is_set():
+                buf = proc.stdout.read(frame_bytes)
+                if len(buf) < frame_bytes:
+                    break
+                frame = np.frombuffer(buf, dtype=np.uint8).reshape(h, w, 3)
+                if not put((index, index / fps, frame)):
+                    break
+                index += 1
+        finally:
+            put(done)
+
+    video_thread = threading.Thread(target=produce, daemon=True)
+    video_thread.start()
+
+    store = FrameStoreWriter(store_dir) if store_dir is not None else None
+    count = 0
+
+    try:
+        while True:
+            item = frames_q.get()
+            if item is done:
+                break
+
+            index, timestamp, frame = item
+            if on_frame is not None:
+                on_frame(index, timestamp, frame)
+            if store is not None:
+                store.append(index, timestamp, frame)
+            count += 1
+
+        _, stderr = proc.communicate()
+        if proc.returncode != 0:
+            raise RuntimeError(
+                f"ffmpeg falhou em {video_path}: {stderr.decode('utf-8', 'replace').strip()}"
+            )
+
+        audio = (
+            np.fromfile(audio_raw_path, dtype=np.float32)
+            if os.path.exists(audio_raw_path) else np.zeros(0, dtype=np.float32)
+        )
+    finally:
+        # Libera o produtor (pode estar bloqueado na fila) e o ffmpeg
+        stop.set()
+        while True:
+            try:
+                frames_q.get_nowait()
+            except queue.Empty:
+                break
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        video_thread.join()
+        proc.stdout.close()
+        proc.stderr.close()
+
+        if store is not None:
+            store.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if audio_output is not None:
+        os.makedirs(os.path.dirname(audio_output), exist_ok=True)
+        sf.write(audio_output, audio, sr, subtype="PCM_16")
+        print(f"✅ Áudio salvo em: {audio_output}")
+
+    print(f"✅ {count} frames e {len(audio) / sr:.1f}s de áudio extraídos")
+
+    return {
+        "audio": audio,
+        "sr": sr,
+        "frame_count": count,
+    }
+
 
 if __name__ == "__main__":
     extract_video_and_frames("data/raw/exemplo_01.mp4")
@@ -0,0 +1,140 @@
+"""
+Arquivo: frame_source.py
+Função: Fornecer os frames de um vídeo em streaming, direto do cv2.VideoCapture.
+Objetivo:
+  - eliminar o dump intermediário de JPEGs em data/raw/frames
+  - memória constante, independente da duração do vídeo
+Saída:
+  - iterador de (frame_index, timestamp, frame) com frame em BGR (np.ndarray)
+"""
+
+import os
+import cv2
+
+
+def video_info(video_path: str):
+    """
+    Retorna metadados básicos do vídeo:
+      - fps, frame_count, width, height
+    """
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Arquivo não encontrado: {video_path}")
+
+    cap = cv2.VideoCapture(video_path)
+    info = {
+        "fps": cap.get(cv2.CAP_PROP_FPS) or 30.0,
+        "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    }
+    cap.release()
+    return info
+
+
+def iter_video_frames(video_path: str, start: int = 0, end: int = None, step: int = 1):
+    """
+    Gera (frame_index, timestamp, frame) lendo o vídeo sequencialmente.
+
+    - start/end: intervalo de frames [start, end)
+    - step: amostragem regular (frames intermediários são apenas
+      avançados com grab(), sem conversão para ndarray)
+
+    Apenas um frame fica em memória por vez.
+    """
+    if step < 1:
+        raise ValueError(f"step deve ser >= 1 (recebido: {step})")
+
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Arquivo não encontrado: {video_path}")
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    try:
+        # Seek verificado: CAP_PROP_POS_FRAMES pode cair no keyframe anterior
+        if start > 0 and not seek_to(cap, start):
+            return
+
+        index = start
+        while end is None or index < end:
+            if (index - start) % step != 0:
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+
+            success, frame = cap.read()
+            if not success:
+                break
+
+            yield index, index / fps, frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def seek_to(cap, index: int, current: int = None):
+    """
+    Posiciona o VideoCapture exatamente no frame `index`.
+    Se o backend cair antes do alvo (seek no keyframe anterior), avança com grab().
+    Se cair depois, recomeça do início.
+    Retorna False se o vídeo terminar antes do alvo.
+    """
+    if current is None or current > index:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        current = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+
+        if current > index:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            current = 0
+
+    while current < index:
+        if not cap.grab():
+            return False
+        current += 1
+
+    return True
+
+
+def iter_video_frames_at(video_path: str, indices, seek_gap: int = 60):
+    """
+    Gera (frame_index, timestamp, frame) apenas para os índices pedidos.
+
+    - lacunas pequenas são percorridas com grab() (sem conversão para ndarray)
+    - lacunas maiores que seek_gap usam seek (CAP_PROP_POS_FRAMES)
+    """
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Arquivo não encontrado: {video_path}")
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    pos = 0
+
+    try:
+        for index in sorted(set(int(i) for i in indices)):
+            # Lacuna grande → seek; pequena → grab() sequencial
+            if not seek_to(cap, index, None if index - pos > seek_gap else pos):
+                return
+
+            success, frame = cap.read()
+            if not success:
+                return
+            pos = index + 1
+
+            yield index, index / fps, frame
+    finally:
+        cap.release()
+
+
+def iter_frame_files(frames_dir: str, fps: float = 30.0):
+    """
+    Compatibilidade com o fluxo antigo: gera (frame_index, timestamp, frame)
+    a partir de um diretório de JPEGs (frame_XXXXX.jpg).
+    """
+    frame_files = sorted(f for f in os.listdir(frames_dir) if f.endswith(".jpg"))
+
+    for index, file in enumerate(frame_files):
+        frame = cv2.imread(os.path.join(frames_dir, file))
+        if frame is None:
+            continue
+        yield index, index / fps, frame
@@ -0,0 +1,154 @@
+"""
+Arquivo: frame_store.py
+Função: Armazenar frames de tamanho fixo (uint8) em poucos arquivos grandes.
+Objetivo:
+  - substituir milhões de JPEGs pequenos por chunks .npy
+  - acesso aleatório sem cópia via numpy.memmap
+Estrutura em disco:
+  - <store_dir>/meta.json         (shape, dtype, chunk_size, n_frames)
+  - <store_dir>/index.npy         (frame_index, chunk, offset, timestamp)
+  - <store_dir>/chunk_XXXXX.npy   (chunk_size × H × W [× C])
+"""
+
+import os
+import json
+import numpy as np
+
+
+INDEX_DTYPE = np.dtype([
+    ("frame_index", np.int64),
+    ("chunk", np.int32),
+    ("offset", np.int32),
+    ("timestamp", np.float64),
+])
+
+
+class FrameStoreWriter:
+    """
+    Grava frames sequencialmente em chunks memory-mapped.
+    O shape é fixado pelo primeiro frame recebido.
+    """
+
+    def __init__(self, store_dir, chunk_size=256):
+        self.store_dir = store_dir
+        self.chunk_size = chunk_size
+        os.makedirs(store_dir, exist_ok=True)
+
+        self.frame_shape = None
+        self.index = []
+        self._chunk = None
+        self._chunk_id = -1
+        self._offset = 0
+
+    def _chunk_path(self, chunk_id):
+        return os.path.join(self.store_dir, f"chunk_{chunk_id:05d}.npy")
+
+    def _open_next_chunk(self):
+        if self._chunk is not None:
+            self._chunk.flush()
+
+        self._chunk_id += 1
+        self._offset = 0
+        self._chunk = np.lib.format.open_memmap(
+            self._chunk_path(self._chunk_id),
+            mode="w+",
+            dtype=np.uint8,
+            shape=(self.chunk_size, *self.frame_shape)
+        )
+
+    def append(self, frame_index, timestamp, frame):
+        if self.frame_shape is None:
+            self.frame_shape = tuple(frame.shape)
+
+        if tuple(frame.shape) != self.frame_shape:
+            raise ValueError(
+                f"Frame {frame_index} com shape {frame.shape}, "
+                f"esperado {self.frame_shape}"
+            )
+
+        if self._chunk is None or self._offset >= self.chunk_size:
+            self._open_next_chunk()
+
+        self._chunk[self._offset] = frame
+        self.index.append((
+            frame_index,
+            self._chunk_id,
+            self._offset,
+            -1.0 if timestamp is None else timestamp
+        ))
+        self._offset += 1
+
+    def close(self):
+        if self._chunk is not None:
+            self._chunk.flush()
+            self._chunk = None
+
+        np.save(
+            os.path.join(self.store_dir, "index.npy"),
+            np.array(self.index, dtype=INDEX_DTYPE)
+        )
+
+        meta = {
+            "frame_shape": list(self.frame_shape or []),
+            "dtype": "uint8",
+            "chunk_size": self.chunk_size,
+            "n_chunks": self._chunk_id + 1,
+            "n_frames": len(self.index),
+        }
+        with open(os.path.join(self.store_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameStore:
+    """
+    Leitura de um frame store gravado por FrameStoreWriter.
+
+    - store[frame_index] → view memmap (sem cópia)
+    - iter(store) → (frame_index, timestamp, frame), compatível com
+      frame_source.iter_video_frames
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+
+        with open(os.path.join(store_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        self.index = np.load(os.path.join(store_dir, "index.npy"))
+        self.frame_shape = tuple(self.meta["frame_shape"])
+        self._chunks = {}
+        self._lookup = {
+            int(fi): i for i, fi in enumerate(self.index["frame_index"])
+        }
+
+    def _chunk(self, chunk_id):
+        if chunk_id not in self._chunks:
+            self._chunks[chunk_id] = np.load(
+                os.path.join(self.store_dir, f"chunk_{chunk_id:05d}.npy"),
+                mmap_mode="r"
+            )
+        return self._chunks[chunk_id]
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, frame_index):
+        return int(frame_index) in self._lookup
+
+    def timestamp(self, frame_index):
+        return float(self.index[self._lookup[int(frame_index)]]["timestamp"])
+
+    def __getitem__(self, frame_index):
+        entry = self.index[self._lookup[int(frame_index)]]
+        return self._chunk(int(entry["chunk"]))[int(entry["offset"])]
+
+    def __iter__(self):
+        for entry in self.index:
+            frame = self._chunk(int(entry["chunk"]))[int(entry["offset"])]
+            yield int(entry["frame_index"]), float(entry["timestamp"]), frame
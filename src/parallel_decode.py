@@ -0,0 +1,229 @@
+"""
+Arquivo: parallel_decode.py
+Função: Decodificar um vídeo em paralelo, por segmentos de tempo.
+Objetivo:
+  - usar todos os núcleos na extração de frames (o loop cap.read() usa um só)
+  - manter a saída em ordem, no mesmo formato de frame_source.iter_video_frames
+Estratégia:
+  - o vídeo é dividido em segmentos de ~segment_sec segundos, com os
+    inícios alinhados a keyframes (sondados uma vez com o ffmpeg, só
+    decodificando keyframes); o último segmento fica aberto e decodifica
+    até o EOF (CAP_PROP_FRAME_COUNT é estimado)
+  - cada processo abre um único cv2.VideoCapture e percorre seus
+    segmentos (round-robin) com seek verificado: num keyframe o seek não
+    re-decodifica o GOP anterior
+  - os frames voltam em blocos de chunk_frames por uma fila limitada por
+    processo: no máximo workers × (max_chunks + 1) × chunk_frames frames
+    ficam em memória, independente do tamanho do segmento
+"""
+
+import os
+import queue
+import re
+import subprocess
+import time
+from bisect import bisect_left
+from multiprocessing import get_context
+
+import cv2
+
+from frame_source import iter_video_frames, video_info, seek_to
+
+
+def probe_keyframes(video_path: str, fps: float):
+    """
+    Índices (ordenados) dos keyframes do vídeo, a partir dos pts dos
+    frames que o ffmpeg decodifica com -skip_frame nokey.
+    Retorna None se o ffmpeg (imageio-ffmpeg) não estiver disponível.
+    Um índice impreciso só custa desempenho: o seek continua verificado.
+    """
+    try:
+        from imageio_ffmpeg import get_ffmpeg_exe
+
+        proc = subprocess.run(
+            [
+                get_ffmpeg_exe(), "-hide_banner", "-nostdin", "-v", "info",
+                "-skip_frame", "nokey", "-i", video_path,
+                "-map", "0:v:0", "-vf", "showinfo", "-f", "null", "-",
+            ],
+            capture_output=True, text=True, errors="replace"
+        )
+    except (ImportError, OSError):
+        return None
+
+    times = re.findall(r"pts_time:\s*([-0-9.eE+]+)", proc.stderr)
+    keyframes = sorted({max(0, int(round(float(t) * fps))) for t in times})
+    return keyframes or None
+
+
+def plan_segments(frame_count: int, fps: float, segment_sec: float = 2.0, keyframes=None):
+    """
+    Divide [0, frame_count) em intervalos [start, end) de ~segment_sec segundos.
+    Com keyframes, cada início é o primeiro keyframe a partir do corte
+    nominal (GOPs longos geram segmentos maiores).
+    O último tem end=None: decodifica até o fim real do vídeo.
+    """
+    seg_len = max(1, int(round(fps * segment_sec)))
+    starts = list(range(0, max(frame_count, 1), seg_len))
+
+    if keyframes:
+        aligned = {0}
+        for cut in starts[1:]:
+            i = bisect_left(keyframes, cut)
+            if i < len(keyframes):
+                aligned.add(keyframes[i])
+        starts = sorted(aligned)
+
+    return list(zip(starts, starts[1:] + [None]))
+
+
+def _decode_worker(video_path, segments, chunk_frames, out):
+    """
+    Decodifica os segmentos deste processo, em ordem, com um único
+    VideoCapture, enviando blocos de frames e um None ao fim de cada
+    segmento.
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    try:
+        for start, end in segments:
+            chunk = []
+            # current=None: seek direto (CAP_PROP_POS_FRAMES), sem grab()
+            # por cima dos segmentos dos outros processos
+            if seek_to(cap, start):
+                index = start
+                while end is None or index < end:
+                    success, frame = cap.read()
+                    if not success:
+                        break
+                    chunk.append((index, index / fps, frame))
+                    index += 1
+                    if len(chunk) >= chunk_frames:
+                        out.put(chunk)
+                        chunk = []
+            if chunk:
+                out.put(chunk)
+            out.put(None)
+    except Exception as e:
+        out.put(RuntimeError(f"Falha ao decodificar {video_path}: {e}"))
+    finally:
+        cap.release()
+
+
+def _segment_chunks(proc, results, timeout_s):
+    """
+    Blocos de um segmento, até o marcador de fim; não trava se o
+    processo morrer sem enviá-lo.
+    """
+    while True:
+        try:
+            chunk = results.get(timeout=timeout_s)
+        except queue.Empty:
+            if not proc.is_alive():
+                raise RuntimeError(
+                    f"Processo de decodificação encerrou (exitcode={proc.exitcode})"
+                )
+            continue
+
+        if chunk is None:
+            return
+        if isinstance(chunk, Exception):
+            raise chunk
+        yield chunk
+
+
+def iter_video_frames_parallel(
+    video_path: str,
+    workers: int = None,
+    segment_sec: float = 2.0,
+    chunk_frames: int = 8,
+    max_chunks: int = 2,
+    align_keyframes: bool = True,
+    report: bool = True
+):
+    """
+    Gera (frame_index, timestamp, frame) em ordem, decodificando
+    segmentos em paralelo em `workers` processos.
+
+    - chunk_frames: frames por bloco enviado ao processo principal
+    - max_chunks: blocos prontos por processo antes de ele esperar
+    - align_keyframes: inícios de segmento nos keyframes (probe_keyframes)
+    """
+    info = video_info(video_path)
+    workers = workers or os.cpu_count() or 1
+
+    keyframes = probe_keyframes(video_path, info["fps"]) if align_keyframes else None
+    if align_keyframes and keyframes is None:
+        print("ℹ️ Keyframes indisponíveis (ffmpeg); segmentos de tamanho fixo")
+
+    segments = plan_segments(info["frame_count"], info["fps"], segment_sec, keyframes)
+    workers = min(workers, len(segments))
+
+    ctx = get_context("spawn")
+    channels = []
+    for w in range(workers):
+        results = ctx.Queue(maxsize=max_chunks)
+        proc = ctx.Process(
+            target=_decode_worker,
+            args=(video_path, segments[w::workers], chunk_frames, results),
+            daemon=True
+        )
+        proc.start()
+        channels.append((proc, results))
+
+    count = 0
+    t0 = time.perf_counter()
+
+    try:
+        # Segmento i está no processo i % workers, na ordem de envio
+        for i in range(len(segments)):
+            proc, results = channels[i % workers]
+            for chunk in _segment_chunks(proc, results, timeout_s=1.0):
+                for frame in chunk:
+                    yield frame
+                    count += 1
+    finally:
+        for proc, _ in channels:
+            if proc.is_alive():
+                proc.terminate()
+            proc.join()
+
+    if report:
+        elapsed = time.perf_counter() - t0
+        print(
+            f"⚡ {count} frames decodificados com {workers} processos "
+            f"em {elapsed:.1f}s ({count / max(elapsed, 1e-9):.1f} frames/s)"
+        )
+
+
+def benchmark_decoding(video_path: str, worker_counts=(2, 4, 8), segment_sec: float = 2.0):
+    """
+    Compara o loop sequencial (iter_video_frames) com o decodificador
+    paralelo. Retorna {workers: frames/s}, com workers=1 para o sequencial.
+    """
+    results = {}
+
+    t0 = time.perf_counter()
+    count = sum(1 for _ in iter_video_frames(video_path))
+    results[1] = count / max(time.perf_counter() - t0, 1e-9)
+    print(f"🎞️ Sequencial: {results[1]:.1f} frames/s")
+
+    for workers in worker_counts:
+        t0 = time.perf_counter()
+        count = sum(
+            1 for _ in iter_video_frames_parallel(
+                video_path, workers=workers, segment_sec=segment_sec, report=False
+            )
+        )
+        results[workers] = count / max(time.perf_counter() - t0, 1e-9)
+        print(
+            f"⚡ {workers} processos: {results[workers]:.1f} frames/s "
+            f"({results[workers] / max(results[1], 1e-9):.2f}x)"
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_decoding("data/raw/exemplo_01.mp4")
@@ -1,33 +1,61 @@
 import cv2
-import csv
 import os
 import random
-from inference_sdk import InferenceHTTPClient
+
+from fretboard_detectors import Detection, create_detector, default_backend
+from detection_log import DetectionLog, video_file_hash
 
 # ----------------------------
 # Configurações
 # ----------------------------
-MODEL_ID = "guitar-object-detection-9ct1j/1"
-CSV_PATH = "logs/roboflow_detections.csv"
+# Sem FRETBOARD_DETECTOR: YOLO/ONNX local se os pesos existirem
+DETECTOR_BACKEND = os.environ.get("FRETBOARD_DETECTOR") or default_backend()
 VISUAL_SAMPLE_SIZE = 20
 CONF_THRESHOLD = 0.5
 
-os.makedirs("logs", exist_ok=True)
+# Log de detecções em lote (ver detection_log.py)
+detection_log = DetectionLog()
+
+
+def set_video(video_path):
+    """
+    Associa as próximas detecções ao vídeo de entrada (hash no log),
+    permitindo o replay depois com ReplayDetector(video_hash=...).
+    """
+    global _detector
+
+    detection_log.flush()
+    detection_log.video_hash = video_file_hash(video_path)
+
+    # Replay é por vídeo: recriado no próximo uso com o novo hash
+    if DETECTOR_BACKEND == "replay":
+        _detector = None
+
+    return detection_log.video_hash
+
+
+# Detector criado no primeiro uso (uma vez só)
+_detector = None
 
-# Inicializa CSV (header único)
-if not os.path.exists(CSV_PATH):
-    with open(CSV_PATH, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "frame_id", "x1", "y1", "x2", "y2", "confidence", "model_id"
-        ])
 
+def get_detector():
+    global _detector
+    if _detector is None:
+        kwargs = {"video_hash": detection_log.video_hash} if DETECTOR_BACKEND == "replay" else {}
+        _detector = create_detector(DETECTOR_BACKEND, **kwargs)
+    return _detector
 
-# Inicializa cliente Roboflow (uma vez só)
-CLIENT = InferenceHTTPClient(
-    api_url="https://serverless.roboflow.com",
-    api_key="sVdBA38eeBKfkK7U5Hb0"
-)
+
+def set_detector(detector=None, **kwargs):
+    """
+    Troca o backend: aceita uma instância de FretboardDetector
+    ou o nome de um backend registrado ("roboflow", "yolo", ...).
+    """
+    global _detector
+    if detector is None or isinstance(detector, str):
+        detector = create_detector(detector, **kwargs)
+    _detector = detector
+    return _detector
 
 
 # Buffer para visualização aleatória
@@ -35,43 +63,37 @@ _visual_buffer = []
 _frame_counter = 0
 _visualized = False
 
-def detect_fretboard(frame):
+
+def _finalize(frame, detection, frame_id=None):
+    """
+    Clamp da bbox, log CSV e coleta para visualização.
+    Retorna Detection com bbox inteira ou None.
+    """
     global _frame_counter, _visualized
 
-    result = CLIENT.infer(frame, model_id=MODEL_ID)
+    if frame_id is not None:
+        _frame_counter = frame_id
 
-    predictions = result.get("predictions", [])
-    if not predictions:
+    if detection is None:
+        detector = get_detector()
+        if detector.log_detections:
+            detection_log.record_miss(_frame_counter, detector.model_id)
         _frame_counter += 1
-        return None, None
-
-    # Pega a maior box (área)
-    pred = max(predictions, key=lambda p: p["width"] * p["height"])
+        return None
 
-    x_center, y_center = pred["x"], pred["y"]
-    w, h = pred["width"], pred["height"]
-    conf = pred["confidence"]
-
-    x1 = int(x_center - w / 2)
-    y1 = int(y_center - h / 2)
-    x2 = int(x_center + w / 2)
-    y2 = int(y_center + h / 2)
+    x1, y1, x2, y2 = detection.bbox
+    conf = detection.confidence
 
     # Clamp
     h_img, w_img = frame.shape[:2]
-    x1, y1 = max(0, x1), max(0, y1)
-    x2, y2 = min(w_img, x2), min(h_img, y2)
-
-    roi = frame[y1:y2, x1:x2]
+    x1, y1 = max(0, int(x1)), max(0, int(y1))
+    x2, y2 = min(w_img, int(x2)), min(h_img, int(y2))
 
     # ----------------------------
     # Log CSV
     # ----------------------------
-    with open(CSV_PATH, "a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            _frame_counter, x1, y1, x2, y2, conf, MODEL_ID
-        ])
+    if get_detector().log_detections:
+        detection_log.record(_frame_counter, (x1, y1, x2, y2), conf, detection.model_id)
 
     # ----------------------------
     # Coleta para visualização
@@ -96,16 +118,71 @@ def detect_fretboard(frame):
             _visualized = True
 
     _frame_counter += 1
+    return Detection(bbox=(x1, y1, x2, y2), confidence=conf, model_id=detection.model_id)
+
+
+def detect_fretboard_bbox(frame, frame_id=None):
+    """
+    Retorna Detection (bbox inteira, já recortada ao frame) ou None.
+    """
+    return _finalize(frame, get_detector().detect(frame, frame_id), frame_id)
+
+
+def submit_fretboard_bbox(frame, frame_id=None):
+    """
+    Versão antecipada de detect_fretboard_bbox: com backend em pipeline
+    ("pipelined"), a requisição sai agora e roda em paralelo.
+    Retorna uma função sem argumentos que devolve o mesmo que
+    detect_fretboard_bbox; nos demais backends a detecção só acontece
+    quando ela é chamada.
+    """
+    detector = get_detector()
+    if not hasattr(detector, "submit"):
+        return lambda: detect_fretboard_bbox(frame, frame_id)
+
+    future = detector.submit(frame, frame_id)
+    return lambda: _finalize(frame, future.result(), frame_id)
+
+
+def detect_fretboard(frame, frame_id=None):
+    detection = detect_fretboard_bbox(frame, frame_id)
+    if detection is None:
+        return None, None
+
+    x1, y1, x2, y2 = detection.bbox
+    roi = frame[y1:y2, x1:x2]
     return roi, (x1, y1, x2, y2)
 
 
+def detect_fretboard_batch(frames, frame_ids=None):
+    """
+    Detecção em lote (uma chamada ao backend para vários frames).
+    Retorna lista de (roi, bbox), com (None, None) quando não há detecção.
+    """
+    if frame_ids is None:
+        frame_ids = [None] * len(frames)
+
+    detections = get_detector().detect_batch(frames, frame_ids)
+
+    out = []
+    for frame, det, frame_id in zip(frames, detections, frame_ids):
+        det = _finalize(frame, det, frame_id)
+        if det is None:
+            out.append((None, None))
+            continue
+        x1, y1, x2, y2 = det.bbox
+        out.append((frame[y1:y2, x1:x2], (x1, y1, x2, y2)))
+
+    return out
+
+
 def _show_visual_samples():
-    print("🖼️ Mostrando amostra de detecções do Roboflow...")
+    print("🖼️ Mostrando amostra de detecções do braço...")
 
     samples = random.sample(_visual_buffer, VISUAL_SAMPLE_SIZE)
 
     for i, img in enumerate(samples):
-        cv2.imshow(f"Roboflow Sample {i+1}", img)
+        cv2.imshow(f"Fretboard Sample {i+1}", img)
 
     cv2.waitKey(0)
     cv2.destroyAllWindows()
\ No newline at end of file
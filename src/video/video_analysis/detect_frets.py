@@ -2,7 +2,7 @@ import cv2
 import numpy as np
 from fretboard_state import Fret
 
-def detect_frets(fretboard_img, max_frets=24):
+def _fret_positions(fretboard_img):
     gray = cv2.cvtColor(fretboard_img, cv2.COLOR_BGR2GRAY)
     edges = cv2.Canny(gray, 80, 160)
 
@@ -23,11 +23,31 @@ def detect_frets(fretboard_img, max_frets=24):
         if abs(x1 - x2) < 10:
             xs.append(x1)
 
+    return xs
+
+
+def detect_frets(fretboard_img, max_frets=24, features=None, max_dx=10, min_length_frac=0.6, greedy=True):
+    """
+    features: LineSegments já no espaço retificado
+    (ex.: FrameFeatures(roi).fret_segments().transformed(H)); evita Canny + Hough próprios.
+    greedy=False: devolve todas as linhas candidatas (sem o filtro de
+    espaçamento), para o ajuste do modelo em fret_model.solve_fret_grid.
+    """
+    if features is None:
+        xs = _fret_positions(fretboard_img)
+    else:
+        h = features.shape[0]
+        segs = features.vertical(max_dx=max_dx, min_length=h * min_length_frac)
+        xs = [int(round(x)) for x in segs[:, 0]]
+
     if not xs:
         return []
 
     xs = sorted(xs)
 
+    if not greedy:
+        return [Fret(index=i, x=x) for i, x in enumerate(xs)]
+
     frets = []
     last_dist = None
     index = 0
@@ -1,25 +1,35 @@
 import cv2
 from fretboard_state import String
 
-def detect_strings(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, 80, 200)
+def detect_strings(img, features=None, max_dy=10, min_length_frac=0.6):
+    """
+    features: LineSegments já no espaço retificado
+    (ex.: FrameFeatures(roi).string_segments().transformed(H)); evita Canny + Hough próprios.
+    """
+    ys = []
 
-    lines = cv2.HoughLinesP(
-        edges,
-        1,
-        3.14159 / 180,
-        threshold=150,
-        minLineLength=img.shape[1] * 0.6,
-        maxLineGap=10
-    )
+    if features is not None:
+        w = features.shape[1]
+        segs = features.horizontal(max_dy=max_dy, min_length=w * min_length_frac)
+        ys = [int(round(y)) for y in segs[:, 1]]
+    else:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        edges = cv2.Canny(gray, 80, 200)
 
-    ys = []
-    if lines is not None:
-        for l in lines:
-            x1, y1, x2, y2 = l[0]
-            if abs(y1 - y2) < 10:
-                ys.append(y1)
+        lines = cv2.HoughLinesP(
+            edges,
+            1,
+            3.14159 / 180,
+            threshold=150,
+            minLineLength=img.shape[1] * 0.6,
+            maxLineGap=10
+        )
+
+        if lines is not None:
+            for l in lines:
+                x1, y1, x2, y2 = l[0]
+                if abs(y1 - y2) < max_dy:
+                    ys.append(y1)
 
     ys = sorted(set(ys))
 
@@ -0,0 +1,108 @@
+import atexit
+import csv
+import hashlib
+import os
+
+from fretboard_detectors import Detection
+
+
+CSV_PATH = "logs/fretboard_detections.csv"
+LOG_COLUMNS = [
+    "frame_id", "x1", "y1", "x2", "y2", "confidence", "model_id", "video_hash"
+]
+
+
+def video_file_hash(video_path, block_size=1 << 20):
+    """
+    Identificador rápido do vídeo de entrada: sha1 do tamanho
+    + primeiro e último bloco (não lê o arquivo inteiro).
+    """
+    size = os.path.getsize(video_path)
+    h = hashlib.sha1(str(size).encode("utf-8"))
+
+    with open(video_path, "rb") as f:
+        h.update(f.read(block_size))
+        if size > block_size:
+            f.seek(max(size - block_size, block_size))
+            h.update(f.read(block_size))
+
+    return h.hexdigest()[:16]
+
+
+class DetectionLog:
+    """
+    Log estruturado das detecções do braço, com escrita em lote
+    (um open/close a cada flush_every linhas, não a cada frame).
+    """
+
+    def __init__(self, path=CSV_PATH, video_hash="", flush_every=256):
+        self.path = path
+        self.video_hash = video_hash
+        self.flush_every = flush_every
+        self._rows = []
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        # Inicializa CSV (header único)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "w", newline="") as f:
+                csv.writer(f).writerow(LOG_COLUMNS)
+
+        atexit.register(self.flush)
+
+    def record(self, frame_id, bbox, confidence, model_id):
+        x1, y1, x2, y2 = bbox
+        self._rows.append([
+            frame_id, x1, y1, x2, y2, confidence, model_id, self.video_hash
+        ])
+
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+
+    def record_miss(self, frame_id, model_id):
+        """
+        Frame consultado sem detecção: linha com bbox vazia, para o
+        replay distinguir "não detectou" de "não foi consultado".
+        """
+        self._rows.append([frame_id, "", "", "", "", "", model_id, self.video_hash])
+
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+
+        with open(self.path, "a", newline="") as f:
+            csv.writer(f).writerows(self._rows)
+        self._rows = []
+
+
+def load_detection_log(path=CSV_PATH, video_hash=None):
+    """
+    Lê um log de detecções: {frame_id: Detection ou None}.
+    None: o detector foi consultado e não encontrou o braço.
+    Com video_hash, considera apenas as linhas daquele vídeo.
+    Se um frame aparecer mais de uma vez, vale a última linha.
+    """
+    detections = {}
+
+    with open(path, "r", newline="") as f:
+        for row in csv.DictReader(f):
+            if video_hash is not None and row.get("video_hash") != video_hash:
+                continue
+
+            if not row["x1"]:
+                detections[int(row["frame_id"])] = None
+                continue
+
+            detections[int(row["frame_id"])] = Detection(
+                bbox=(
+                    int(row["x1"]), int(row["y1"]),
+                    int(row["x2"]), int(row["y2"])
+                ),
+                confidence=float(row["confidence"]),
+                model_id=row["model_id"]
+            )
+
+    return detections
@@ -0,0 +1,217 @@
+"""
+detector_benchmark.py
+- Roda vários backends de detecção do braço sobre o dataset YOLO
+- Reporta imagens/s, latência p50/p95, pico de memória e mAP@0.5
+  numa única tabela (stdout) + JSON (logs/detector_benchmark.json)
+- Cada backend roda em um processo separado, para que o pico de
+  memória (ru_maxrss) seja só dele; o pico é reportado acima da linha
+  de base medida com as imagens já carregadas (modelo + inferência)
+- Backends em pipeline recebem lotes de pelo menos max_in_flight
+  imagens, para que as requisições realmente se sobreponham
+"""
+
+import json
+import os
+import queue as queue_module
+import resource
+import sys
+import time
+from multiprocessing import get_context
+
+import numpy as np
+
+from detector_eval import DATASET_DIR, evaluate_detector, load_split
+
+
+OUT_PATH = "logs/detector_benchmark.json"
+
+# (nome, backend, kwargs) — backends de fretboard_detectors + "stub"
+DEFAULT_SUITE = [
+    ("yolo-320", "yolo", {"imgsz": 320}),
+    ("yolo-480", "yolo", {"imgsz": 480}),
+    ("yolo-640", "yolo", {"imgsz": 640}),
+    ("onnx-640", "onnx", {"model_path": "models/fretboard_yolo.onnx"}),
+    ("onnx-int8-dyn-640", "onnx", {"model_path": "models/fretboard_yolo.int8-dyn.onnx"}),
+    ("onnx-int8-640", "onnx", {"model_path": "models/fretboard_yolo.int8.onnx"}),
+    ("stub-remote-8", "stub", {"latency_s": 0.1, "max_in_flight": 8}),
+]
+
+
+def _build(backend, kwargs):
+    """
+    Retorna (detector, cleanup).
+    """
+    if backend == "stub":
+        from stub_detector_server import serve_stub
+        from fretboard_detectors import RemoteHTTPDetector
+        from detector_pipeline import PipelinedDetector
+
+        server, api_url = serve_stub(latency_s=kwargs.get("latency_s", 0.1))
+        detector = PipelinedDetector(
+            RemoteHTTPDetector(model_id="stub/1", api_url=api_url, api_key="stub"),
+            max_in_flight=kwargs.get("max_in_flight", 8)
+        )
+
+        def cleanup():
+            detector.close()
+            server.shutdown()
+
+        return detector, cleanup
+
+    from fretboard_detectors import create_detector
+    return create_detector(backend, **kwargs), lambda: None
+
+
+def _peak_rss_mb():
+    # ru_maxrss: KB no Linux, bytes no macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _run_one(spec, speed_split, map_split, batch_size, limit, queue):
+    name, backend, kwargs = spec
+    try:
+        speed_data = load_split(speed_split, limit)
+        map_data = speed_data if map_split == speed_split else load_split(map_split)
+        baseline_mb = _peak_rss_mb()
+
+        detector, cleanup = _build(backend, kwargs)
+        # Lote de 1 num PipelinedDetector deixaria uma única requisição em voo
+        batch_size = max(batch_size, getattr(detector, "max_in_flight", 1))
+        try:
+            speed = evaluate_detector(detector, speed_split, batch_size=batch_size, loaded=speed_data)
+            quality = (
+                speed if map_data is speed_data
+                else evaluate_detector(detector, map_split, batch_size=batch_size, loaded=map_data)
+            )
+        finally:
+            cleanup()
+
+        lat = np.array(speed["latencies_ms"])
+        queue.put({
+            "name": name,
+            "backend": backend,
+            "params": kwargs,
+            "batch_size": batch_size,
+            "n_images": speed["n_images"],
+            "images_per_s": round(speed["images_per_s"], 2),
+            "latency_ms_p50": round(float(np.percentile(lat, 50)), 2),
+            "latency_ms_p95": round(float(np.percentile(lat, 95)), 2),
+            "baseline_rss_mb": round(baseline_mb, 1),
+            "peak_rss_mb": round(_peak_rss_mb() - baseline_mb, 1),
+            "map50": None if quality["map50"] is None else round(quality["map50"], 4),
+        })
+    except Exception as e:
+        queue.put({"name": name, "backend": backend, "params": kwargs, "error": str(e)})
+
+
+def _wait_result(proc, queue, timeout_s):
+    """
+    Resultado do processo filho, sem travar se ele morrer sem responder
+    (ex.: OOM, segfault em biblioteca nativa) ou exceder timeout_s.
+    """
+    deadline = None if timeout_s is None else time.monotonic() + timeout_s
+
+    while True:
+        try:
+            return queue.get(timeout=1.0)
+        except queue_module.Empty:
+            if proc.exitcode is not None:
+                # Pode ter posto o resultado logo antes de sair
+                try:
+                    return queue.get(timeout=1.0)
+                except queue_module.Empty:
+                    return {"error": f"processo encerrou sem resultado (exitcode={proc.exitcode})"}
+            if deadline is not None and time.monotonic() > deadline:
+                proc.terminate()
+                return {"error": f"tempo esgotado ({timeout_s:.0f}s)"}
+
+
+def _has_labels(split_dir):
+    labels = os.path.join(split_dir, "labels")
+    return os.path.isdir(labels) and any(f.endswith(".txt") for f in os.listdir(labels))
+
+
+def run_benchmark(
+    suite=DEFAULT_SUITE,
+    split="test",
+    map_split=None,
+    batch_size=1,
+    limit=None,
+    out_path=OUT_PATH,
+    timeout_s=1800
+):
+    """
+    - split: split usado para velocidade
+    - map_split: split usado para mAP@0.5; por padrão o próprio split,
+      ou "val" se ele não tiver labels (o test/ do repositório não tem)
+    - timeout_s: tempo máximo por backend (None: sem limite)
+    """
+    speed_split = os.path.join(DATASET_DIR, split)
+
+    if map_split is None:
+        map_split = split if _has_labels(speed_split) else "val"
+    map_split_dir = os.path.join(DATASET_DIR, map_split)
+
+    ctx = get_context("spawn")
+    results = []
+
+    for spec in suite:
+        queue = ctx.Queue()
+        proc = ctx.Process(
+            target=_run_one,
+            args=(spec, speed_split, map_split_dir, batch_size, limit, queue)
+        )
+        proc.start()
+        result = _wait_result(proc, queue, timeout_s)
+        proc.join()
+
+        name, backend, kwargs = spec
+        result = {"name": name, "backend": backend, "params": kwargs, **result}
+
+        result["speed_split"] = split
+        result["map_split"] = map_split
+        results.append(result)
+
+    print_table(results)
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"📊 Benchmark salvo em: {out_path}")
+
+    return results
+
+
+def print_table(results):
+    header = f"{'backend':<20} {'img/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'ΔRSS MB':>8} {'mAP@.5':>7}"
+    print(header)
+    print("-" * len(header))
+
+    for r in results:
+        if "error" in r:
+            print(f"{r['name']:<20} erro: {r['error']}")
+            continue
+
+        map50 = "-" if r["map50"] is None else f"{r['map50']:.3f}"
+        print(
+            f"{r['name']:<20} {r['images_per_s']:>8.1f} {r['latency_ms_p50']:>8.1f} "
+            f"{r['latency_ms_p95']:>8.1f} {r['peak_rss_mb']:>8.0f} {map50:>7}"
+        )
+
+
+def pick_fastest(results, min_map50):
+    """
+    Backend mais rápido (imagens/s) que atinge o piso de acurácia.
+    """
+    eligible = [
+        r for r in results
+        if "error" not in r and r["map50"] is not None and r["map50"] >= min_map50
+    ]
+    if not eligible:
+        return None
+    return max(eligible, key=lambda r: r["images_per_s"])
+
+
+if __name__ == "__main__":
+    run_benchmark()
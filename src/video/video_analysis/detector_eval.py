@@ -0,0 +1,211 @@
+"""
+detector_eval.py
+- Avalia backends de detecção do braço sobre um split do dataset YOLO
+  (datasets/yolo_dataset/{train,val,test}/images + labels)
+- Mede latência por imagem e mAP@0.5 (quando o split tem labels)
+"""
+
+import os
+import time
+
+import cv2
+import numpy as np
+
+
+DATASET_DIR = "datasets/yolo_dataset"
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def list_split(split_dir):
+    """
+    Retorna [(caminho_imagem, caminho_label ou None)].
+    """
+    images_dir = os.path.join(split_dir, "images")
+    labels_dir = os.path.join(split_dir, "labels")
+
+    items = []
+    for f in sorted(os.listdir(images_dir)):
+        if not f.lower().endswith(IMAGE_EXTS):
+            continue
+        label = os.path.join(labels_dir, os.path.splitext(f)[0] + ".txt")
+        items.append((
+            os.path.join(images_dir, f),
+            label if os.path.exists(label) else None
+        ))
+
+    return items
+
+
+def load_yolo_labels(label_path, w, h):
+    """
+    Labels YOLO (classe cx cy bw bh, normalizados) → boxes xyxy em pixels.
+    """
+    boxes = []
+    with open(label_path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            cx, cy, bw, bh = (float(v) for v in parts[1:5])
+            boxes.append([
+                (cx - bw / 2) * w, (cy - bh / 2) * h,
+                (cx + bw / 2) * w, (cy + bh / 2) * h
+            ])
+
+    return np.array(boxes, dtype=float).reshape(-1, 4)
+
+
+def box_iou(box, boxes):
+    xx1 = np.maximum(box[0], boxes[:, 0])
+    yy1 = np.maximum(box[1], boxes[:, 1])
+    xx2 = np.minimum(box[2], boxes[:, 2])
+    yy2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / (area + areas - inter + 1e-9)
+
+
+def average_precision(detections, ground_truths, iou_threshold=0.5):
+    """
+    detections: [(image_idx, score, box xyxy)]
+    ground_truths: {image_idx: array (K, 4)}
+    AP com interpolação em todos os pontos (VOC 2010+).
+    """
+    n_gt = sum(len(g) for g in ground_truths.values())
+    if n_gt == 0:
+        return None
+
+    matched = {i: np.zeros(len(g), dtype=bool) for i, g in ground_truths.items()}
+    tp = []
+
+    for image_idx, _, box in sorted(detections, key=lambda d: -d[1]):
+        gts = ground_truths.get(image_idx, np.zeros((0, 4)))
+        if len(gts) == 0:
+            tp.append(0)
+            continue
+
+        ious = box_iou(np.asarray(box), gts)
+        best = int(ious.argmax())
+        if ious[best] >= iou_threshold and not matched[image_idx][best]:
+            matched[image_idx][best] = True
+            tp.append(1)
+        else:
+            tp.append(0)
+
+    tp = np.array(tp, dtype=float)
+    tp_cum = np.cumsum(tp)
+    fp_cum = np.cumsum(1 - tp)
+
+    recall = tp_cum / n_gt
+    precision = tp_cum / np.maximum(tp_cum + fp_cum, 1e-9)
+
+    # Envelope monotônico da precisão
+    mrec = np.concatenate([[0.0], recall, [1.0]])
+    mpre = np.concatenate([[1.0], precision, [0.0]])
+    mpre = np.maximum.accumulate(mpre[::-1])[::-1]
+
+    idx = np.where(mrec[1:] != mrec[:-1])[0]
+    return float(np.sum((mrec[idx + 1] - mrec[idx]) * mpre[idx + 1]))
+
+
+def load_split(split_dir, limit=None):
+    """
+    (items de list_split, imagens já decodificadas) do split.
+    """
+    items = list_split(split_dir)[:limit]
+    if not items:
+        raise FileNotFoundError(f"Nenhuma imagem em: {split_dir}")
+
+    return items, [cv2.imread(path) for path, _ in items]
+
+
+def evaluate_detector(detector, split_dir, batch_size=1, warmup=2, limit=None, loaded=None):
+    """
+    Roda um FretboardDetector sobre as imagens do split.
+    loaded: resultado de load_split, para reaproveitar imagens já lidas.
+    Retorna {n_images, latencies_ms (por imagem), images_per_s, map50}.
+    map50 é None se o split não tiver labels.
+    """
+    items, images = loaded if loaded is not None else load_split(split_dir, limit)
+
+    # Aquecimento (alocação de sessão, caches)
+    for img in images[:warmup]:
+        detector.detect(img)
+
+    latencies = []
+    detections = []
+    t_total = time.perf_counter()
+
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size]
+
+        t0 = time.perf_counter()
+        results = detector.detect_batch(batch)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+
+        latencies.extend([elapsed_ms / len(batch)] * len(batch))
+        for offset, det in enumerate(results):
+            if det is not None:
+                detections.append((start + offset, det.confidence, det.bbox))
+
+    t_total = time.perf_counter() - t_total
+
+    ground_truths = {}
+    for i, ((_, label), img) in enumerate(zip(items, images)):
+        if label is not None:
+            h, w = img.shape[:2]
+            ground_truths[i] = load_yolo_labels(label, w, h)
+
+    map50 = None
+    if ground_truths:
+        labelled = [d for d in detections if d[0] in ground_truths]
+        map50 = average_precision(labelled, ground_truths, 0.5)
+
+    return {
+        "n_images": len(images),
+        "latencies_ms": latencies,
+        "images_per_s": len(images) / max(t_total, 1e-9),
+        "map50": map50,
+    }
+
+
+def compare_onnx_with_pytorch(
+    weights="models/fretboard_yolo.pt",
+    onnx_models=("models/fretboard_yolo.onnx", "models/fretboard_yolo.int8.onnx"),
+    latency_split=os.path.join(DATASET_DIR, "test"),
+    map_split=os.path.join(DATASET_DIR, "val"),
+    imgsz=640
+):
+    """
+    Latência (split de teste) e mAP@0.5 (split com labels) do modelo
+    PyTorch contra as versões ONNX/int8.
+    """
+    from fretboard_detectors import YOLODetector, OnnxDetector
+
+    backends = {"pytorch": YOLODetector(weights, imgsz=imgsz)}
+    for path in onnx_models:
+        if os.path.exists(path):
+            backends[os.path.basename(path)] = OnnxDetector(path, imgsz=imgsz)
+
+    report = {}
+    for name, detector in backends.items():
+        speed = evaluate_detector(detector, latency_split)
+        quality = evaluate_detector(detector, map_split)
+
+        report[name] = {
+            "latency_ms_p50": float(np.percentile(speed["latencies_ms"], 50)),
+            "images_per_s": speed["images_per_s"],
+            "map50": quality["map50"],
+        }
+        print(
+            f"📊 {name}: {report[name]['latency_ms_p50']:.1f} ms/img, "
+            f"mAP@0.5={report[name]['map50']}"
+        )
+
+    return report
+
+
+if __name__ == "__main__":
+    compare_onnx_with_pytorch()
@@ -0,0 +1,129 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from fretboard_detectors import FretboardDetector, create_detector
+
+
+# 4xx que valem nova tentativa: timeout da requisição e throttling
+RETRYABLE_CLIENT_STATUS = (408, 429)
+
+
+def _status(error):
+    # urllib.error.HTTPError expõe .code; o inference_sdk, .status_code
+    status = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _is_client_error(error):
+    status = _status(error)
+    return (
+        status is not None and 400 <= status < 500 and
+        status not in RETRYABLE_CLIENT_STATUS
+    )
+
+
+def _retry_after(error):
+    """
+    Segundos pedidos pelo servidor (Retry-After numérico), ou None.
+    """
+    headers = getattr(error, "headers", None)
+    value = headers.get("Retry-After") if headers is not None else None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class PipelinedDetector(FretboardDetector):
+    """
+    Mantém até `max_in_flight` requisições em voo para um backend remoto
+    (ex.: RemoteHTTPDetector, RoboflowDetector) e devolve os resultados
+    na ordem dos frames.
+
+    - backpressure: novos frames só são enviados quando há vaga
+    - retry: até `retries` novas tentativas com backoff exponencial
+    - timeout: delegado ao backend (timeout por requisição); após esgotar
+      as tentativas o frame fica sem detecção (None)
+    """
+
+    def __init__(self, detector, max_in_flight=8, retries=2, backoff_s=0.25):
+        self.detector = detector
+        self.model_id = detector.model_id
+        self.log_detections = detector.log_detections
+        self.max_in_flight = max_in_flight
+        self.retries = retries
+        self.backoff_s = backoff_s
+
+        self.failures = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    @classmethod
+    def from_backend(cls, inner="http", max_in_flight=8, retries=2, backoff_s=0.25, **kwargs):
+        """
+        Envolve um backend registrado; kwargs vão para o backend interno.
+        """
+        return cls(
+            create_detector(inner, **kwargs),
+            max_in_flight=max_in_flight,
+            retries=retries,
+            backoff_s=backoff_s
+        )
+
+    def _detect_with_retry(self, frame, frame_id):
+        for attempt in range(self.retries + 1):
+            try:
+                return self.detector.detect(frame, frame_id)
+            except Exception as e:
+                # URLError, timeouts, erros HTTP do SDK, respostas inválidas;
+                # 4xx (chave inválida, payload rejeitado) não melhora com
+                # retry, exceto 408/429 (respeitando Retry-After)
+                if attempt == self.retries or _is_client_error(e):
+                    self.failures += 1
+                    print(f"⚠️ Detecção falhou no frame {frame_id}: {e}")
+                    return None
+                delay = self.backoff_s * (2 ** attempt)
+                if _status(e) in RETRYABLE_CLIENT_STATUS:
+                    delay = max(delay, _retry_after(e) or 0.0)
+                time.sleep(delay)
+
+    def submit(self, frame, frame_id=None):
+        """
+        Dispara a detecção de um frame e retorna o Future da Detection
+        (ou None após esgotar as tentativas).
+        """
+        return self._executor.submit(self._detect_with_retry, frame, frame_id)
+
+    def detect_batch(self, frames, frame_ids=None):
+        if frame_ids is None:
+            frame_ids = [None] * len(frames)
+
+        return [
+            detection for _, _, _, detection in self.detect_stream(
+                (frame_id, None, frame) for frame_id, frame in zip(frame_ids, frames)
+            )
+        ]
+
+    def detect_stream(self, frames):
+        """
+        Consome (frame_index, timestamp, frame) e gera
+        (frame_index, timestamp, frame, detection) em ordem.
+        """
+        pending = deque()
+
+        for frame_id, timestamp, frame in frames:
+            if len(pending) >= self.max_in_flight:
+                yield self._pop(pending)
+
+            pending.append((frame_id, timestamp, frame, self.submit(frame, frame_id)))
+
+        while pending:
+            yield self._pop(pending)
+
+    @staticmethod
+    def _pop(pending):
+        frame_id, timestamp, frame, future = pending.popleft()
+        return frame_id, timestamp, frame, future.result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,119 @@
+import cv2
+import numpy as np
+
+
+class LineSegments:
+    """
+    Conjunto de segmentos (N, 4) = x1, y1, x2, y2 num espaço de imagem
+    de tamanho `shape`, com visões filtradas para cada consumidor.
+    """
+
+    def __init__(self, segments, shape):
+        self.segments = np.asarray(segments, dtype=np.float32).reshape(-1, 4)
+        self.shape = shape[:2]
+
+    def lengths(self):
+        d = self.segments[:, 2:] - self.segments[:, :2]
+        return np.hypot(d[:, 0], d[:, 1])
+
+    def vertical(self, max_dx=10, min_length=0.0):
+        """
+        Segmentos quase verticais (trastes no espaço retificado).
+        """
+        s = self.segments
+        keep = (np.abs(s[:, 0] - s[:, 2]) < max_dx) & (self.lengths() >= min_length)
+        return s[keep]
+
+    def horizontal(self, max_dy=10, min_length=0.0):
+        """
+        Segmentos quase horizontais (cordas no espaço retificado).
+        """
+        s = self.segments
+        keep = (np.abs(s[:, 1] - s[:, 3]) < max_dy) & (self.lengths() >= min_length)
+        return s[keep]
+
+    def transformed(self, H, shape=None):
+        """
+        Leva os extremos dos segmentos por uma homografia 3×3,
+        sem reamostrar imagem nenhuma.
+        """
+        if len(self.segments) == 0:
+            return LineSegments(self.segments, shape or self.shape)
+
+        pts = self.segments.reshape(-1, 1, 2)
+        moved = cv2.perspectiveTransform(pts, np.asarray(H, dtype=np.float64))
+        return LineSegments(moved.reshape(-1, 4), shape or self.shape)
+
+
+class FrameFeatures:
+    """
+    Cinza, bordas e linhas de um frame, calculados sob demanda e
+    memorizados por conjunto de limiares. Cada consumidor pede as
+    linhas com os próprios limiares — os mesmos do seu caminho sem
+    features (detect_frets, detect_strings, estimate_rectification) —
+    então a saída de linhas não muda; o ganho está em não reamostrar a
+    ROI (os segmentos é que são levados por H), na conversão para cinza
+    única e em não repetir Canny/Hough com limiares iguais.
+    """
+
+    def __init__(self, img):
+        self.img = img
+        self.shape = img.shape[:2]
+
+        self._gray = None
+        self._edges = {}
+        self._segments = {}
+        self._angles = {}
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def edges(self, low, high):
+        if (low, high) not in self._edges:
+            self._edges[low, high] = cv2.Canny(self.gray, low, high)
+        return self._edges[low, high]
+
+    def segments(self, canny, threshold, min_length, max_line_gap=10):
+        """
+        LineSegments do HoughLinesP sobre Canny(*canny).
+        """
+        key = (canny, threshold, min_length, max_line_gap)
+        if key not in self._segments:
+            lines = cv2.HoughLinesP(
+                self.edges(*canny),
+                rho=1,
+                theta=np.pi / 180,
+                threshold=threshold,
+                minLineLength=min_length,
+                maxLineGap=max_line_gap
+            )
+            self._segments[key] = LineSegments(
+                np.zeros((0, 4), dtype=np.float32) if lines is None
+                else lines[:, 0].astype(np.float32),
+                self.shape
+            )
+        return self._segments[key]
+
+    def line_angles(self, canny, threshold):
+        """
+        theta de cada linha do HoughLines (padrão) sobre Canny(*canny).
+        """
+        key = (canny, threshold)
+        if key not in self._angles:
+            lines = cv2.HoughLines(self.edges(*canny), 1, np.pi / 180, threshold)
+            self._angles[key] = np.zeros(0) if lines is None else lines[:, 0, 1]
+        return self._angles[key]
+
+    # Limiares de cada consumidor (iguais aos caminhos sem features)
+
+    def fret_segments(self):
+        return self.segments((80, 160), 120, self.shape[0] * 0.6)
+
+    def string_segments(self):
+        return self.segments((80, 200), 150, self.shape[1] * 0.6)
+
+    def rectification_angles(self):
+        return self.line_angles((60, 140), 160)
@@ -0,0 +1,292 @@
+"""
+fret_model.py
+- Modelo de espaçamento dos trastes em temperamento igual:
+    x_n = nut_x + direction · L · (1 − r^n),   r = 2^(−1/12)
+  (L = comprimento de escala em px, nut_x = posição da pestana)
+- Ajuste robusto (RANSAC sobre pares + mínimos quadrados com pesos de
+  Huber) a partir de qualquer subconjunto de linhas detectadas
+- Com o modelo, todas as posições saem em forma fechada: poucas linhas
+  por frame bastam para um grid completo e consistente
+
+Observação: deslocar todos os índices por k só reescala L, então o
+espaçamento sozinho não fixa qual linha é o traste 1. Por padrão a
+pestana é a linha prevista mais ao lado dos espaços largos que ainda
+cai dentro da imagem (a ROI do detector cobre a pestana); first_index
+permite fixar o índice da linha detectada mais próxima da pestana.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from fretboard_state import Fret
+
+
+RATIO = 2 ** (-1 / 12)
+
+
+@dataclass
+class FretGridModel:
+    nut_x: float
+    scale_length: float      # px, pestana → ponte
+    direction: int           # +1: pestana à esquerda, −1: à direita
+    inliers: int
+    residual: float          # erro médio (px) das linhas usadas
+
+    def positions(self, n_frets=24, width=None):
+        """
+        x de cada traste 0..n_frets (0 = pestana); com width, só os
+        que caem dentro da imagem.
+        """
+        n = np.arange(n_frets + 1)
+        xs = self.nut_x + self.direction * self.scale_length * (1 - RATIO ** n)
+        if width is None:
+            return xs
+        return xs[(xs >= 0) & (xs < width)]
+
+    def frets(self, n_frets=24, width=None):
+        n = np.arange(n_frets + 1)
+        xs = self.positions(n_frets)
+        if width is not None:
+            inside = (xs >= 0) & (xs < width)
+            n, xs = n[inside], xs[inside]
+        return [Fret(index=int(i), x=int(round(x))) for i, x in zip(n, xs)]
+
+    def index_of(self, x):
+        """
+        Índice contínuo (fracionário) do traste na posição x.
+        """
+        u = 1 - self.direction * (np.asarray(x, dtype=float) - self.nut_x) / self.scale_length
+        return -12 * np.log2(np.clip(u, 1e-9, None))
+
+    @property
+    def nut_on_left(self):
+        return self.direction > 0
+
+    def fret_numbers(self, xs, n_frets=24):
+        """
+        Número absoluto (0 = pestana) da linha em cada x, ou −1 fora de
+        0..n_frets. Serve para linhas que já não vêm do modelo (grid
+        rastreado, refinado).
+        """
+        n = np.rint(self.index_of(xs)).astype(int)
+        return np.where((n >= 0) & (n <= n_frets), n, -1)
+
+
+def _merge_candidates(xs, merge_px):
+    """
+    Funde linhas a até merge_px da vizinha (o mesmo traste visto como
+    vários segmentos). Retorna (posições médias, quantas linhas em cada).
+    """
+    xs = np.sort(np.asarray(xs, dtype=float))
+    if len(xs) == 0:
+        return xs, np.zeros(0, dtype=int)
+
+    group = np.concatenate([[0], np.cumsum(np.diff(xs) > merge_px)])
+    counts = np.bincount(group)
+    return np.bincount(group, weights=xs) / counts, counts
+
+
+def _seed_lines(counts, max_seeds):
+    """
+    Índices das até max_seeds linhas mais fortes (mais segmentos
+    fundidos); empates são escolhidos espaçados ao longo do braço.
+    """
+    if len(counts) <= max_seeds:
+        return np.arange(len(counts))
+
+    chosen = []
+    for c in np.unique(counts)[::-1]:
+        group = np.flatnonzero(counts == c)
+        room = max_seeds - len(chosen)
+        if len(group) > room:
+            group = group[np.round(np.linspace(0, len(group) - 1, room)).astype(int)]
+        chosen.extend(group)
+        if len(chosen) >= max_seeds:
+            break
+
+    return np.sort(np.array(chosen))
+
+
+def _hypotheses(xs, max_frets, lines=None):
+    """
+    (A, B) de x_m = A − B·r^m para cada par de linhas (i, j) e diferença
+    de índice relativa d ∈ ±[1, max_frets], com a linha i em m = 0.
+    lines: índices das linhas que formam pares (padrão: todas).
+    Retorna (A, B, i, j), com o par de origem de cada hipótese.
+    """
+    lines = np.arange(len(xs)) if lines is None else np.asarray(lines)
+    pi, pj = (lines[k] for k in np.triu_indices(len(lines), k=1))
+    d = np.concatenate([np.arange(1, max_frets + 1), -np.arange(1, max_frets + 1)])
+
+    i = np.repeat(pi, len(d))
+    j = np.repeat(pj, len(d))
+    dd = np.tile(d, len(pi))
+
+    B = (xs[j] - xs[i]) / (1 - RATIO ** dd)
+    A = xs[i] + B
+    return A, B, i, j
+
+
+def _chance_rate(A, B, width, max_frets, tolerance_px):
+    """
+    Fração da imagem a até tolerance_px de alguma linha prevista: a
+    chance de uma linha espúria (uniforme em x) contar como inlier.
+    Grids mais densos cobrem mais e explicam mais linhas ao acaso.
+    """
+    m = np.arange(-max_frets, max_frets + 1)
+    pos = A[:, None] - B[:, None] * RATIO ** m[None, :]
+    gap = np.abs(B)[:, None] * (1 - RATIO) * RATIO ** m[None, :]
+    window = np.minimum(2 * tolerance_px, gap)
+    inside = (pos >= 0) & (pos < width)
+    return np.clip((window * inside).sum(axis=1) / width, 0.0, 1.0)
+
+
+def _assign(xs, A, B, max_frets):
+    """
+    Para cada hipótese, o índice relativo mais próximo de cada linha
+    (piso/teto do índice contínuo) e a distância em px.
+    Retorna (indices (H, N), dist (H, N)).
+    """
+    u = (A[:, None] - xs[None, :]) / B[:, None]
+    m_cont = np.log(np.clip(u, 1e-9, None)) / np.log(RATIO)
+
+    best_m = None
+    best_d = None
+    for m in (np.floor(m_cont), np.ceil(m_cont)):
+        m = np.clip(m, -max_frets, max_frets)
+        d = np.abs(xs[None, :] - (A[:, None] - B[:, None] * RATIO ** m))
+        if best_d is None:
+            best_m, best_d = m, d
+        else:
+            closer = d < best_d
+            best_m = np.where(closer, m, best_m)
+            best_d = np.where(closer, d, best_d)
+
+    # Linhas além da assíntota (ponte) não pertencem ao grid
+    best_d = np.where(u > 0, best_d, np.inf)
+    return best_m.astype(int), best_d
+
+
+def _refit(xs, m, huber_px, iterations=5):
+    """
+    Mínimos quadrados com pesos de Huber (IRLS) de x = A − B·r^m.
+    """
+    X = np.stack([np.ones(len(m)), -RATIO ** m], axis=1)
+    w = np.ones(len(xs))
+
+    for _ in range(iterations):
+        sw = np.sqrt(w)
+        (A, B), *_ = np.linalg.lstsq(X * sw[:, None], xs * sw, rcond=None)
+        r = np.abs(xs - X @ np.array([A, B]))
+        w = np.where(r <= huber_px, 1.0, huber_px / np.maximum(r, 1e-9))
+
+    return A, B
+
+
+def solve_fret_grid(
+    xs,
+    width,
+    max_frets=24,
+    tolerance_px=4.0,
+    min_gap_px=None,
+    min_inliers=3,
+    first_index=None,
+    nut_margin_px=4.0,
+    max_seeds=30,
+    min_excess_sigma=3.0
+):
+    """
+    Ajusta o modelo de temperamento igual às posições x detectadas
+    (quaisquer linhas quase verticais, com espúrias e faltantes).
+
+    - linhas a até tolerance_px umas das outras são fundidas; só as
+      max_seeds mais fortes formam os pares de hipóteses (custo
+      O(max_seeds²), não O(N²)), mas todas contam como inliers
+    - min_gap_px (padrão 4 × tolerance_px): menor espaço entre trastes
+      aceito no trecho observado
+    - o grid escolhido é o que mais excede o suporte que linhas
+      aleatórias teriam na sua densidade, e o excesso precisa passar de
+      min_excess_sigma desvios-padrão (grids densos explicam quase
+      qualquer linha)
+
+    Retorna FretGridModel ou None se não houver suporte suficiente.
+    """
+    if min_gap_px is None:
+        min_gap_px = 4 * tolerance_px
+
+    xs, counts = _merge_candidates(xs, tolerance_px)
+    if len(xs) < max(min_inliers, 2):
+        return None
+
+    A, B, pi, pj = _hypotheses(xs, max_frets, _seed_lines(counts, max_seeds))
+
+    # Todo o trecho observado precisa estar aquém da ponte (u > 0) e o
+    # menor espaço entre trastes nele, |B|·(1 − r)·r^m = |B|·(1 − r)·u,
+    # não pode ser menor que min_gap_px (descarta grids densos que
+    # "explicam" qualquer linha)
+    u = (A[:, None] - xs[[0, -1]][None, :]) / B[:, None]
+    min_gap = np.abs(B) * (1 - RATIO) * u.min(axis=1)
+    valid = (u > 0).all(axis=1) & (min_gap >= min_gap_px)
+    if not valid.any():
+        return None
+    A, B, pi, pj = A[valid], B[valid], pi[valid], pj[valid]
+
+    idx, dist = _assign(xs, A, B, max_frets)
+    inlier = dist <= tolerance_px
+    n_in = inlier.sum(axis=1)
+    cost = np.where(inlier, dist, tolerance_px).sum(axis=1)
+
+    # Suporte MSAC: cada linha inlier vale c·(1 − (d/tol)²), c = segmentos
+    # fundidos nela. O par de origem casa por construção; as outras
+    # casariam ao acaso com probabilidade p e d uniforme em [0, tol]:
+    # média p·(2/3)·Σc, variância (p·8/15 − (p·2/3)²)·Σc²
+    score = np.where(inlier, 1 - (dist / tolerance_px) ** 2, 0.0)
+    pair = counts[pi] + counts[pj]
+    pair_sq = counts[pi] ** 2 + counts[pj] ** 2
+    support = (score * counts[None, :]).sum(axis=1) - pair
+    p = _chance_rate(A, B, width, max_frets, tolerance_px)
+    excess = support - p * (2 / 3) * (counts.sum() - pair)
+    var = p * 8 / 15 - (p * 2 / 3) ** 2
+    sigma = np.sqrt(np.maximum(var * ((counts ** 2).sum() - pair_sq), 1e-9))
+
+    best = np.lexsort((cost, -excess))[0]
+    if n_in[best] < min_inliers or excess[best] < min_excess_sigma * sigma[best]:
+        return None
+
+    # Refinamento: reajusta e reatribui índices (2 rodadas)
+    keep = inlier[best]
+    m_fit = idx[best][keep]
+    for _ in range(2):
+        a, b = _refit(xs[keep], m_fit.astype(float), tolerance_px)
+        m_all, d_all = _assign(xs, np.array([a]), np.array([b]), max_frets)
+        keep = d_all[0] <= tolerance_px
+        if keep.sum() < min_inliers:
+            return None
+        m_fit = m_all[0][keep]
+        resid = d_all[0][keep]
+
+    # Ancoragem da pestana (índice absoluto)
+    m_first = int(m_fit.min())
+    if first_index is not None:
+        m0 = m_first - int(first_index)
+    else:
+        # Desce pelos índices (espaços maiores) enquanto a linha
+        # prevista ainda cai dentro da imagem
+        m0 = m_first
+        while m0 - 1 >= m_first - max_frets:
+            x_prev = a - b * RATIO ** (m0 - 1)
+            if x_prev < -nut_margin_px or x_prev > width + nut_margin_px:
+                break
+            m0 -= 1
+
+    L = b * RATIO ** m0
+    nut_x = a - L
+
+    return FretGridModel(
+        nut_x=float(nut_x),
+        scale_length=float(abs(L)),
+        direction=1 if L > 0 else -1,
+        inliers=int(keep.sum()),
+        residual=float(resid.mean())
+    )
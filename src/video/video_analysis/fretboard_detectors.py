@@ -0,0 +1,415 @@
+import os
+import json
+import base64
+import urllib.request
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+
+# ----------------------------
+# Configurações
+# ----------------------------
+ROBOFLOW_MODEL_ID = "guitar-object-detection-9ct1j/1"
+ROBOFLOW_API_URL = "https://serverless.roboflow.com"
+YOLO_WEIGHTS = "models/fretboard_yolo.pt"
+ONNX_MODEL = "models/fretboard_yolo.onnx"
+
+
+@dataclass
+class Detection:
+    bbox: Tuple[float, float, float, float]  # x1, y1, x2, y2 (pixels do frame)
+    confidence: float
+    model_id: str
+
+
+class FretboardDetector(ABC):
+    """
+    Interface dos backends de detecção do braço.
+    detect_batch recebe vários frames e retorna uma Detection (ou None) por frame.
+    frame_ids é opcional para backends que dependem do índice (ex.: replay).
+    """
+
+    model_id = "unknown"
+    log_detections = True
+
+    def detect(self, frame, frame_id=None):
+        return self.detect_batch([frame], [frame_id])[0]
+
+    @abstractmethod
+    def detect_batch(self, frames, frame_ids=None):
+        """
+        Uma Detection (ou None) por frame, na ordem recebida.
+        """
+
+
+def _roboflow_api_key(api_key=None):
+    api_key = api_key or os.environ.get("ROBOFLOW_API_KEY")
+    if not api_key:
+        raise RuntimeError(
+            "ROBOFLOW_API_KEY não definida: exporte a chave da Roboflow ou "
+            "use um backend local (FRETBOARD_DETECTOR=yolo/onnx)"
+        )
+    return api_key
+
+
+def _largest(detections):
+    # Mesma regra do pipeline original: maior box (área)
+    if not detections:
+        return None
+    return max(
+        detections,
+        key=lambda d: (d.bbox[2] - d.bbox[0]) * (d.bbox[3] - d.bbox[1])
+    )
+
+
+class RoboflowDetector(FretboardDetector):
+    """
+    Backend remoto (Roboflow serverless). O cliente é criado no primeiro uso.
+    """
+
+    def __init__(self, model_id=ROBOFLOW_MODEL_ID, api_url=ROBOFLOW_API_URL, api_key=None):
+        self.model_id = model_id
+        self.api_url = api_url
+        self.api_key = _roboflow_api_key(api_key)
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from inference_sdk import InferenceHTTPClient
+
+            self._client = InferenceHTTPClient(
+                api_url=self.api_url,
+                api_key=self.api_key
+            )
+        return self._client
+
+    @staticmethod
+    def parse_predictions(result, model_id):
+        detections = []
+        for p in result.get("predictions", []):
+            detections.append(Detection(
+                bbox=(
+                    p["x"] - p["width"] / 2,
+                    p["y"] - p["height"] / 2,
+                    p["x"] + p["width"] / 2,
+                    p["y"] + p["height"] / 2
+                ),
+                confidence=float(p["confidence"]),
+                model_id=model_id
+            ))
+        return _largest(detections)
+
+    def detect_batch(self, frames, frame_ids=None):
+        return [
+            self.parse_predictions(self.client.infer(frame, model_id=self.model_id), self.model_id)
+            for frame in frames
+        ]
+
+
+class RemoteHTTPDetector(FretboardDetector):
+    """
+    Cliente HTTP mínimo, compatível com a API serverless da Roboflow
+    (POST <api_url>/<model_id>?api_key=... com o JPEG em base64).
+    Sem dependências externas e com timeout por requisição, o que permite
+    apontá-lo para um servidor stub local (stub_detector_server.py).
+    """
+
+    def __init__(
+        self,
+        model_id=ROBOFLOW_MODEL_ID,
+        api_url=ROBOFLOW_API_URL,
+        api_key=None,
+        timeout=10.0,
+        jpeg_quality=90
+    ):
+        self.model_id = model_id
+        self.api_url = api_url.rstrip("/")
+        self.api_key = _roboflow_api_key(api_key)
+        self.timeout = timeout
+        self.jpeg_quality = jpeg_quality
+
+    def _encode(self, frame):
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError("Falha ao codificar o frame em JPEG")
+        return base64.b64encode(buf.tobytes())
+
+    def infer(self, frame):
+        request = urllib.request.Request(
+            f"{self.api_url}/{self.model_id}?api_key={self.api_key}",
+            data=self._encode(frame),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    def detect_batch(self, frames, frame_ids=None):
+        return [
+            RoboflowDetector.parse_predictions(self.infer(frame), self.model_id)
+            for frame in frames
+        ]
+
+
+class YOLODetector(FretboardDetector):
+    """
+    Backend local (ultralytics), CPU por padrão.
+    Os pesos são carregados uma única vez; detect_batch faz uma
+    inferência por lote.
+    """
+
+    def __init__(self, weights=YOLO_WEIGHTS, imgsz=640, conf=0.25, device="cpu"):
+        from ultralytics import YOLO
+
+        if not os.path.exists(weights):
+            raise FileNotFoundError(f"Pesos YOLO não encontrados: {weights}")
+
+        self.model = YOLO(weights)
+        self.model_id = os.path.basename(weights)
+        self.imgsz = imgsz
+        self.conf = conf
+        self.device = device
+
+    def detect_batch(self, frames, frame_ids=None):
+        results = self.model.predict(
+            list(frames),
+            imgsz=self.imgsz,
+            conf=self.conf,
+            device=self.device,
+            verbose=False
+        )
+
+        out = []
+        for r in results:
+            boxes = r.boxes
+            detections = [
+                Detection(
+                    bbox=tuple(float(v) for v in xyxy),
+                    confidence=float(c),
+                    model_id=self.model_id
+                )
+                for xyxy, c in zip(boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy())
+            ]
+            out.append(_largest(detections))
+
+        return out
+
+
+def letterbox(img, size):
+    """
+    Redimensiona mantendo a proporção e completa com cinza (114), como no
+    treino do ultralytics. Retorna (imagem size×size, escala, (pad_x, pad_y)).
+    """
+    h, w = img.shape[:2]
+    r = min(size / h, size / w)
+    nh, nw = int(round(h * r)), int(round(w * r))
+
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+
+    return canvas, r, (left, top)
+
+
+def nms(boxes, scores, iou_threshold):
+    """
+    Non-maximum suppression em NumPy. boxes: (N, 4) xyxy.
+    Retorna os índices mantidos, por score decrescente.
+    """
+    order = scores.argsort()[::-1]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+
+        order = rest[iou <= iou_threshold]
+
+    return np.array(keep, dtype=int)
+
+
+class OnnxDetector(FretboardDetector):
+    """
+    Backend local em onnxruntime (CPU), para modelos exportados por
+    datasets/yolo_dataset/export_fretboard_onnx.py (float32 ou int8).
+    Pré/pós-processamento próprios: letterbox, decodificação da saída
+    YOLOv8/11 (1, 4 + nc, N) e NMS.
+    """
+
+    def __init__(self, model_path=ONNX_MODEL, imgsz=640, conf=0.25, iou=0.45, threads=None):
+        import onnxruntime as ort
+
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Modelo ONNX não encontrado: {model_path}")
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        # Exportado com batch fixo → inferência frame a frame
+        self.dynamic_batch = not isinstance(self.session.get_inputs()[0].shape[0], int)
+
+        self.model_id = os.path.basename(model_path)
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+
+    def _preprocess(self, frames):
+        blobs, metas = [], []
+        for frame in frames:
+            img, r, pad = letterbox(frame, self.imgsz)
+            blobs.append(img[:, :, ::-1].transpose(2, 0, 1))
+            metas.append((r, pad, frame.shape[:2]))
+
+        blob = np.ascontiguousarray(np.stack(blobs), dtype=np.float32) / 255.0
+        return blob, metas
+
+    def _postprocess(self, output, meta):
+        r, (pad_x, pad_y), (h, w) = meta
+
+        preds = output.T  # (N, 4 + nc)
+        scores = preds[:, 4:].max(axis=1)
+        preds, scores = preds[scores >= self.conf], scores[scores >= self.conf]
+        if len(preds) == 0:
+            return None
+
+        cx, cy, bw, bh = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+        boxes = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+
+        keep = nms(boxes, scores, self.iou)
+        boxes, scores = boxes[keep], scores[keep]
+
+        # Desfaz o letterbox
+        boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad_x) / r, 0, w)
+        boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad_y) / r, 0, h)
+
+        return _largest([
+            Detection(bbox=tuple(float(v) for v in b), confidence=float(c), model_id=self.model_id)
+            for b, c in zip(boxes, scores)
+        ])
+
+    def detect_batch(self, frames, frame_ids=None):
+        blob, metas = self._preprocess(frames)
+
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: blob})[0]
+        else:
+            outputs = np.concatenate([
+                self.session.run(None, {self.input_name: blob[i:i + 1]})[0]
+                for i in range(len(blob))
+            ])
+
+        return [self._postprocess(out, meta) for out, meta in zip(outputs, metas)]
+
+
+class ReplayDetector(FretboardDetector):
+    """
+    Serve as bboxes de um log de detecções anterior (detection_log.py),
+    sem custo de detector. Exige frame_id; sem ele, usa um contador interno.
+    O log compartilhado mistura vídeos: é preciso o video_hash
+    (detect_fretboard.set_video) ou um log_path só deste vídeo.
+
+    Frames registrados sem detecção continuam sem detecção; frames que
+    a execução original não consultou (outro detect_every, modo
+    esparso) recebem a detecção registrada mais próxima.
+    """
+
+    log_detections = False
+
+    def __init__(self, log_path=None, video_hash=None):
+        from detection_log import CSV_PATH, load_detection_log
+
+        if not video_hash and log_path is None:
+            raise ValueError(
+                "Replay sem video_hash: chame set_video(video_path) antes "
+                "ou informe o log_path de um único vídeo"
+            )
+
+        self.log_path = log_path or CSV_PATH
+        self.detections = load_detection_log(self.log_path, video_hash or None)
+        self.model_id = f"replay:{os.path.basename(self.log_path)}"
+        self._counter = 0
+
+        # Frames com detecção, ordenados, para o vizinho mais próximo
+        self._detected = np.array(
+            sorted(f for f, d in self.detections.items() if d is not None), dtype=int
+        )
+
+    def _nearest(self, frame_id):
+        if len(self._detected) == 0:
+            return None
+        i = np.searchsorted(self._detected, frame_id)
+        candidates = self._detected[max(i - 1, 0):i + 1]
+        return self.detections[int(candidates[np.abs(candidates - frame_id).argmin()])]
+
+    def detect_batch(self, frames, frame_ids=None):
+        if frame_ids is None:
+            frame_ids = [None] * len(frames)
+
+        out = []
+        for frame_id in frame_ids:
+            if frame_id is None:
+                frame_id = self._counter
+            self._counter = frame_id + 1
+            if frame_id in self.detections:
+                out.append(self.detections[frame_id])
+            else:
+                out.append(self._nearest(frame_id))
+
+        return out
+
+
+def _create_pipelined(**kwargs):
+    # Import tardio: detector_pipeline importa este módulo
+    from detector_pipeline import PipelinedDetector
+
+    return PipelinedDetector.from_backend(**kwargs)
+
+
+DETECTOR_BACKENDS = {
+    "roboflow": RoboflowDetector,
+    "http": RemoteHTTPDetector,
+    "yolo": YOLODetector,
+    "onnx": OnnxDetector,
+    "replay": ReplayDetector,
+    # Requisições concorrentes a um backend remoto (inner="http" por padrão)
+    "pipelined": _create_pipelined,
+}
+
+
+def default_backend():
+    """
+    Backend local quando há pesos treinados; Roboflow só como último recurso.
+    """
+    if os.path.exists(YOLO_WEIGHTS):
+        return "yolo"
+    if os.path.exists(ONNX_MODEL):
+        return "onnx"
+    return "roboflow"
+
+
+def create_detector(backend=None, **kwargs):
+    backend = backend or default_backend()
+    if backend not in DETECTOR_BACKENDS:
+        raise ValueError(
+            f"Backend desconhecido: {backend} (opções: {sorted(DETECTOR_BACKENDS)})"
+        )
+    return DETECTOR_BACKENDS[backend](**kwargs)
@@ -1,14 +1,107 @@
 import numpy as np
 
+
+def _match(tracks, detections, gate_px):
+    """
+    Associação gulosa 1D (par mais próximo primeiro) dentro do gate.
+    Retorna lista de (índice_track, índice_detecção).
+    """
+    if len(tracks) == 0 or len(detections) == 0:
+        return []
+
+    dist = np.abs(tracks[:, None] - detections[None, :])
+    order = np.argsort(dist, axis=None)
+    ti, di = np.unravel_index(order, dist.shape)
+
+    used_t = np.zeros(len(tracks), dtype=bool)
+    used_d = np.zeros(len(detections), dtype=bool)
+    pairs = []
+
+    for t, d in zip(ti, di):
+        if dist[t, d] > gate_px:
+            break
+        if used_t[t] or used_d[d]:
+            continue
+        used_t[t] = used_d[d] = True
+        pairs.append((t, d))
+
+    return pairs
+
+
 class FretboardGridTracker:
-    def __init__(self, alpha=0.7):
+    def __init__(
+        self,
+        alpha=0.7,
+        gate_px=12.0,
+        max_misses=5,
+        residual_scale=3.0,
+        high_confidence=0.8,
+        low_confidence=0.5,
+        max_skip=10
+    ):
+        """
+        Estado por linha (posição + frames sem detecção), associação
+        detecção → linha mesmo quando as contagens diferem e um score
+        de confiança (fração de linhas reencontradas × erro residual).
+
+        mode():
+          - "skip": confiança ≥ high_confidence → reaproveita o grid previsto
+            (no máximo max_skip frames seguidos)
+          - "band": confiança ≥ low_confidence → detecção só numa faixa
+            estreita em torno das linhas previstas
+          - "full": detecção completa
+        """
         self.alpha = alpha  # suavização temporal
+        self.gate_px = gate_px
+        self.max_misses = max_misses
+        self.residual_scale = residual_scale
+        self.high_confidence = high_confidence
+        self.low_confidence = low_confidence
+        self.max_skip = max_skip
+
         self.frets = None
         self.strings = None
+        self.fret_misses = None
+        self.string_misses = None
+
+        self.confidence = 0.0
+        self.residual = None
+        self.skipped = 0
 
     def initialize(self, frets, strings):
-        self.frets = np.array(frets, dtype=float)
-        self.strings = np.array(strings, dtype=float)
+        self.frets = np.sort(np.array(frets, dtype=float))
+        self.strings = np.sort(np.array(strings, dtype=float))
+        self.fret_misses = np.zeros(len(self.frets), dtype=int)
+        self.string_misses = np.zeros(len(self.strings), dtype=int)
+        self.confidence = 0.0
+        self.residual = None
+        self.skipped = 0
+
+    def _update_lines(self, tracks, misses, detections):
+        """
+        Retorna (tracks, misses, reencontradas, resíduos).
+        """
+        pairs = _match(tracks, detections, self.gate_px)
+        tracks = tracks.copy()
+        misses = misses + 1
+        residuals = []
+
+        matched_d = np.zeros(len(detections), dtype=bool)
+        for t, d in pairs:
+            residuals.append(abs(tracks[t] - detections[d]))
+            tracks[t] = self.alpha * tracks[t] + (1 - self.alpha) * detections[d]
+            misses[t] = 0
+            matched_d[d] = True
+
+        found = len(pairs) / max(len(tracks), 1)
+
+        # Linhas perdidas por muitos frames saem; detecções novas entram
+        alive = misses <= self.max_misses
+        tracks = np.concatenate([tracks[alive], detections[~matched_d]])
+        misses = np.concatenate([misses[alive], np.zeros((~matched_d).sum(), dtype=int)])
+
+        order = np.argsort(tracks)
+        return tracks[order], misses[order], found, residuals
 
     def update(self, frets, strings):
         frets = np.array(frets, dtype=float)
@@ -18,17 +111,41 @@ class FretboardGridTracker:
             self.initialize(frets, strings)
             return self.frets, self.strings
 
-        # Garantir correspondência por índice
-        if len(frets) == len(self.frets):
-            self.frets = (
-                self.alpha * self.frets +
-                (1 - self.alpha) * frets
-            )
+        self.frets, self.fret_misses, found_f, res_f = self._update_lines(
+            self.frets, self.fret_misses, frets
+        )
+        self.strings, self.string_misses, found_s, res_s = self._update_lines(
+            self.strings, self.string_misses, strings
+        )
 
-        if len(strings) == len(self.strings):
-            self.strings = (
-                self.alpha * self.strings +
-                (1 - self.alpha) * strings
-            )
+        residuals = res_f + res_s
+        self.residual = float(np.mean(residuals)) if residuals else None
+
+        frame_confidence = 0.5 * (found_f + found_s)
+        if self.residual is not None:
+            frame_confidence *= np.exp(-self.residual / self.residual_scale)
+        else:
+            frame_confidence = 0.0
+
+        self.confidence = 0.5 * self.confidence + 0.5 * frame_confidence
+        self.skipped = 0
 
         return self.frets, self.strings
+
+    def skip(self, decay=0.97):
+        """
+        Frame sem detecção estrutural: mantém o grid previsto e
+        decai a confiança.
+        """
+        self.skipped += 1
+        self.confidence *= decay
+        return self.frets, self.strings
+
+    def mode(self):
+        if self.frets is None or len(self.frets) < 2 or len(self.strings) < 2:
+            return "full"
+        if self.confidence >= self.high_confidence and self.skipped < self.max_skip:
+            return "skip"
+        if self.confidence >= self.low_confidence:
+            return "band"
+        return "full"
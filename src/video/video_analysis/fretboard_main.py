@@ -1,22 +1,46 @@
 import cv2
+import numpy as np
 import random
 
-from detect_fretboard import detect_fretboard
-from rectify_fretboard import rectify_fretboard, refine_homography
+from roi_tracker import FretboardROITracker
+from detect_fretboard import set_video
+from rectify_fretboard import (
+    estimate_rectification,
+    refine_homography_matrix,
+    compose_transforms,
+    map_grid
+)
 from orb_stabilizer import ORBStabilizer
+from frame_features import FrameFeatures
 from detect_frets import detect_frets
 from detect_strings import detect_strings
+from projection_lines import (
+    detect_frets_projection,
+    detect_strings_projection,
+    refine_lines_in_band
+)
+from fret_model import solve_fret_grid
 from grid_visualization import draw_fretboard_grid, draw_notes
 from fretboard_grid_tracker import FretboardGridTracker
-from hand_detector import detect_hand_mask
-from pressure_map import build_pressure_map
-from note_inference import infer_notes_from_pressure
+from hand_detector import (
+    detect_hand_landmarks,
+    hand_mask_from_landmarks,
+    landmarks_to_fretboard
+)
+from hand_worker import get_hand_worker
+from pressure_map import (
+    build_pressure_matrix,
+    fingertip_pressure_matrix,
+    pressure_by_fret_number
+)
+from note_inference import infer_notes_batch, notes_from_arrays
 from pipeline_observer import PipelineObserver
 
 
 # ----------------------------
 # Inicializações globais
 # ----------------------------
+roi_tracker = FretboardROITracker(detect_every=15)
 stabilizer = ORBStabilizer()
 grid_tracker = FretboardGridTracker(alpha=0.7)
 observer = PipelineObserver(max_frames=200)
@@ -24,73 +48,195 @@ observer = PipelineObserver(max_frames=200)
 VIS_BUFFER = []
 VIS_MAX = 20
 
+# Bordas/linhas calculadas sobre a ROI e compartilhadas entre
+# retificação, trastes e cordas (cada um com os próprios limiares;
+# segmentos levados por H_pre, sem warp intermediário).
+# False volta aos detectores próprios sobre a ROI retificada.
+SHARED_FEATURES = True
 
-def process_frame(frame, frame_id=None):
+# Detector de trastes/cordas: "hough" (HoughLinesP) ou
+# "projection" (picos dos perfis de gradiente; precisa da ROI retificada)
+LINE_DETECTOR = "hough"
+
+# Trastes pelo modelo de temperamento igual ajustado às linhas
+# detectadas (grid completo a partir de poucas linhas); sem ajuste,
+# volta ao filtro guloso de detect_frets
+FRET_MODEL = True
+
+# Detecção estrutural guiada pela confiança do grid_tracker:
+# "skip" (grid previsto), "band" (faixas em torno das linhas previstas)
+# ou "full". Nos modos skip/band a retificação do último frame
+# completo é reaproveitada.
+GRID_GATING = True
+last_H_rect = None
+
+# MediaPipe num processo dedicado: o recorte da mão é enviado assim que
+# a ROI é conhecida e a inferência corre em paralelo com a geometria
+HAND_WORKER = True
+
+# Mapa de pressão: "mask" (casco convexo da mão × janelas das
+# interseções) ou "fingertips" (pontas dos dedos localizadas no grid
+# por busca binária, sem máscara)
+PRESSURE_MODE = "mask"
+
+# Afinação (nome em note_inference.TUNINGS ou dict) e capotraste
+TUNING = "standard"
+CAPO = 0
+
+# Último modelo de trastes ajustado (detecção completa): numera as
+# linhas do grid rastreado e diz de que lado fica a pestana. Sem modelo,
+# a n-ésima linha da esquerda é o traste n.
+last_fret_grid = None
+N_FRET_NUMBERS = 25  # pestana + 24 trastes
+
+
+def process_frame(frame, frame_id=None, store=None, timestamp=None, pending_detection=None):
     """
     Processa um único frame.
     Retorna:
       - frame_debug
       - estrutura de notas inferidas
+    Com store (fretboard_store.FretboardStateStore), grava bbox, grid,
+    pressão e notas do frame nas colunas do store.
+    pending_detection: detecção antecipada (roi_tracker.prefetch).
     """
+    global last_H_rect, last_fret_grid
 
     # ----------------------------
     # Passo 1 — Detecção da escala
+    # (detector a cada N frames, rastreamento entre eles)
     # ----------------------------
-    roi, bbox = detect_fretboard(frame)
+    roi, bbox = roi_tracker.update(frame, frame_id, pending_detection)
     if roi is None:
         return None, None
 
     observer.store(frame_id, "roi", roi)
 
+    hand_ticket = get_hand_worker().submit(frame, bbox) if HAND_WORKER else None
+
+    # As etapas geométricas só estimam matrizes 3×3; a ROI é
+    # reamostrada uma única vez (a partir da ROI original) para o
+    # espaço final da escala.
+    h, w = roi.shape[:2]
+    use_projection = LINE_DETECTOR == "projection"
+    mode = grid_tracker.mode() if GRID_GATING else "full"
+    observer.store(frame_id, "grid_mode", mode)
+
+    full = mode == "full"
+    features = (
+        FrameFeatures(roi)
+        if full and SHARED_FEATURES and not use_projection else None
+    )
+
     # ----------------------------
     # Passo 2 — Estabilização
     # ----------------------------
-    stabilized, _ = stabilizer.stabilize(roi)
-    observer.store(frame_id, "stabilized", stabilized)
+    H_stab = stabilizer.estimate(roi)
 
     # ----------------------------
     # Passo 3 — Retificação
     # ----------------------------
-    rectified = rectify_fretboard(stabilized)
-    observer.store(frame_id, "rectified", rectified)
+    if full or last_H_rect is None:
+        last_H_rect = estimate_rectification(roi, features)
+    H_rect = last_H_rect
+    H_pre = compose_transforms(H_stab, H_rect)
+
+    rectified = None
+    if mode == "band" or (full and features is None):
+        rectified = cv2.warpPerspective(
+            roi, H_pre, (w, h),
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_REPLICATE
+        )
+        observer.store(frame_id, "rectified", rectified)
 
     # ----------------------------
     # Passo 4 — Detecção estrutural
     # ----------------------------
-    frets_raw = detect_frets(rectified)
-    strings_raw = detect_strings(rectified)
+    if mode == "skip":
+        frets, strings = grid_tracker.skip()
+    elif mode == "band":
+        frets, strings = grid_tracker.update(*refine_lines_in_band(
+            rectified, grid_tracker.frets, grid_tracker.strings
+        ))
+    else:
+        frets, strings, last_fret_grid = detect_grid_lines(
+            rectified, features, H_pre, w, use_projection
+        )
+        frets, strings = grid_tracker.update(frets, strings)
 
-    frets, strings = grid_tracker.update(frets_raw, strings_raw)
-
-    observer.store(frame_id, "frets", frets)
-    observer.store(frame_id, "strings", strings)
+    # Numeração absoluta dos trastes, no espaço retificado do modelo
+    frets = np.sort(np.asarray(frets, dtype=float))
+    if last_fret_grid is not None:
+        fret_numbers = last_fret_grid.fret_numbers(frets, N_FRET_NUMBERS - 1)
+        nut_on_left = last_fret_grid.nut_on_left
+    else:
+        fret_numbers = np.arange(len(frets))
+        nut_on_left = True
 
     # ----------------------------
-    # Refinamento geométrico
+    # Refinamento geométrico (warp único a partir da ROI)
     # ----------------------------
-    refined = refine_homography(rectified, frets, strings)
+    H_ref, size = refine_homography_matrix(frets, strings)
+
+    if H_ref is None:
+        H_total, size = H_pre, (w, h)
+        refined = rectified if rectified is not None else cv2.warpPerspective(
+            roi, H_pre, (w, h),
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_REPLICATE
+        )
+    else:
+        H_total = compose_transforms(H_stab, H_rect, H_ref)
+        refined = cv2.warpPerspective(roi, H_total, size, flags=cv2.INTER_LINEAR)
+        # Grid no mesmo espaço da imagem refinada (mantém a ordem em x)
+        frets, strings = map_grid(H_ref, frets, np.sort(strings))
+
+    observer.store(frame_id, "frets", frets)
+    observer.store(frame_id, "strings", strings)
     observer.store(frame_id, "refined", refined)
 
     # ----------------------------
     # Passo 4 — Detecção da mão
     # ----------------------------
-    hand_mask = detect_hand_mask(refined)
-    observer.store(frame_id, "hand_mask", hand_mask)
+    # Inferência num recorte reduzido do frame em torno da ROI
+    # (ou da mão anterior); landmarks já no espaço da escala refinada
+    if hand_ticket is not None:
+        landmarks = landmarks_to_fretboard(
+            get_hand_worker().result(hand_ticket), bbox, H_total
+        )
+    else:
+        landmarks = detect_hand_landmarks(frame, bbox, H_total)
+    observer.store(frame_id, "landmarks", landmarks)
 
     # ----------------------------
     # Passo 4 — Mapa de pressão
     # ----------------------------
-    pressure_map = build_pressure_map(
-        hand_mask=hand_mask,
-        frets=frets,
-        strings=strings
-    )
-    observer.store(frame_id, "pressure_map", pressure_map)
+    if PRESSURE_MODE == "fingertips":
+        pressure = fingertip_pressure_matrix(
+            landmarks, frets, strings, nut_on_left=nut_on_left
+        )
+    else:
+        hand_mask = hand_mask_from_landmarks(landmarks, (size[1], size[0]))
+        observer.store(frame_id, "hand_mask", hand_mask)
+
+        # Matriz densa (cordas × trastes) via tabela de somas acumuladas
+        pressure = build_pressure_matrix(
+            hand_mask=hand_mask,
+            frets=frets,
+            strings=strings
+        )
+
+    # Colunas = número absoluto do traste (o grid pode começar depois
+    # da pestana ou ter linhas faltando)
+    pressure = pressure_by_fret_number(pressure, fret_numbers, N_FRET_NUMBERS)
+    observer.store(frame_id, "pressure_map", pressure)
 
     # ----------------------------
     # Passo 5 — Inferência de notas
     # ----------------------------
-    notes = infer_notes_from_pressure(pressure_map)
+    midi, fret = infer_notes_batch(pressure[None], TUNING, CAPO)
+    notes = notes_from_arrays(midi[0], fret[0])
     observer.store(frame_id, "notes", notes)
 
     # ----------------------------
@@ -102,9 +248,132 @@ def process_frame(frame, frame_id=None):
     if frame_id is not None and len(VIS_BUFFER) < VIS_MAX:
         VIS_BUFFER.append((frame_id, debug.copy()))
 
+    if store is not None and frame_id is not None:
+        # x de cada traste na coluna do seu número, como a pressão
+        known = (fret_numbers >= 0) & (fret_numbers < N_FRET_NUMBERS)
+        frets_by_number = np.full(N_FRET_NUMBERS, np.nan, dtype=np.float32)
+        frets_by_number[fret_numbers[known]] = np.asarray(frets)[known]
+
+        store.record(
+            frame_id,
+            timestamp=timestamp,
+            bbox=bbox,
+            frets=frets_by_number,
+            strings=strings,
+            pressure=pressure,
+            notes=notes
+        )
+
     return debug, notes
 
 
+def detect_grid_lines(rectified, features, H_pre, width, use_projection=False):
+    """
+    Detecção estrutural completa.
+    Retorna (xs dos trastes, ys das cordas, FretGridModel ou None)
+    no espaço retificado.
+    """
+    if use_projection:
+        frets_raw = detect_frets_projection(rectified)
+        strings_raw = detect_strings_projection(rectified)
+    elif features is not None:
+        # Segmentos da ROI (limiares de cada detector) levados para o
+        # espaço retificado
+        fret_segments = features.fret_segments().transformed(H_pre)
+        frets_raw = detect_frets(None, features=fret_segments, greedy=not FRET_MODEL)
+        strings_raw = detect_strings(None, features=features.string_segments().transformed(H_pre))
+    else:
+        frets_raw = detect_frets(rectified, greedy=not FRET_MODEL)
+        strings_raw = detect_strings(rectified)
+
+    fret_grid = None
+    if FRET_MODEL:
+        fret_grid = solve_fret_grid([f.x for f in frets_raw], width=width)
+        if fret_grid is not None:
+            frets_raw = fret_grid.frets(width=width)
+        elif not use_projection:
+            frets_raw = detect_frets(
+                rectified, features=None if features is None else fret_segments
+            )
+
+    return [f.x for f in frets_raw], [s.y for s in strings_raw], fret_grid
+
+
+def process_video(frames, store=None, video_path=None):
+    """
+    Consome um iterador de (frame_index, timestamp, frame)
+    (ex.: frame_source.iter_video_frames ou frame_store.FrameStore)
+    sem frames intermediários em JPEG.
+
+    Gera (frame_index, timestamp, notes) para cada frame; com store,
+    o estado de cada frame também vai para o FretboardStateStore.
+    video_path identifica o vídeo no log de detecções (replay).
+    """
+    if video_path is not None:
+        set_video(video_path)
+
+    # Detecções periódicas disparadas à frente (backend "pipelined")
+    for frame_id, timestamp, frame, pending in roi_tracker.prefetch(frames):
+        _, notes = process_frame(
+            frame, frame_id=frame_id, store=store, timestamp=timestamp,
+            pending_detection=pending
+        )
+        yield frame_id, timestamp, notes
+
+    if store is not None:
+        store.flush()
+
+
+def process_video_sparse(frames, frame_count, fps, store=None, video_path=None):
+    """
+    Modo esparso guiado por onsets de áudio.
+
+    - frames: iterador apenas dos frames selecionados
+      (ex.: frame_source.iter_video_frames_at + onset_sampling.select_frames)
+    - frames não amostrados herdam o último estado conhecido da escala
+      (no store, só as notas)
+
+    Gera (frame_index, timestamp, notes, sampled) para todos os
+    frame_count frames do vídeo.
+    """
+    if video_path is not None:
+        set_video(video_path)
+
+    last_notes = None
+    next_index = 0
+
+    def inherit(skipped):
+        if store is not None and last_notes is not None:
+            store.record(skipped, timestamp=skipped / fps, notes=last_notes)
+        return skipped, skipped / fps, last_notes, False
+
+    for frame_id, timestamp, frame, pending in roi_tracker.prefetch(frames):
+        # Frames pulados herdam o último estado
+        for skipped in range(next_index, frame_id):
+            yield inherit(skipped)
+
+        _, notes = process_frame(
+            frame, frame_id=frame_id, store=store, timestamp=timestamp,
+            pending_detection=pending
+        )
+        if notes is None:
+            # Frame amostrado sem resultado (ROI perdida): mantém o último estado
+            if store is not None and last_notes is not None:
+                store.record(frame_id, timestamp=timestamp, notes=last_notes)
+            notes = last_notes
+        else:
+            last_notes = notes
+
+        yield frame_id, timestamp, notes, True
+        next_index = frame_id + 1
+
+    for skipped in range(next_index, frame_count):
+        yield inherit(skipped)
+
+    if store is not None:
+        store.flush()
+
+
 def show_visual_diagnostics():
     """
     Mostra até 20 frames aleatórios.
@@ -0,0 +1,302 @@
+"""
+fretboard_store.py
+- Estado da escala por vídeo em colunas NumPy pré-alocadas
+  (frames × cordas × trastes), sem imagens
+- Com store_dir, cada coluna é um .npy memory-mapped; sem, fica em memória
+- Consumidores (inferência de notas, timeline, fusão) leem fatias das
+  colunas em vez de listas de objetos Python
+Estrutura em disco:
+  - <store_dir>/meta.json      (n_frames, n_strings, n_frets, fps)
+  - <store_dir>/<coluna>.npy   (uma por coluna de COLUMNS)
+"""
+
+import os
+import json
+
+import numpy as np
+
+from fretboard_state import Fret, String, FretboardState
+from note_inference import midi_to_note, infer_notes_batch
+
+
+# nome → (dtype, shape por frame, valor vazio)
+COLUMNS = {
+    "valid":     (np.bool_,   lambda s, f: (),     False),
+    "timestamp": (np.float64, lambda s, f: (),     np.nan),
+    "bbox":      (np.int32,   lambda s, f: (4,),   -1),
+    "frets_x":   (np.float32, lambda s, f: (f,),   np.nan),   # coluna = nº do traste
+    "strings_y": (np.float32, lambda s, f: (s,),   np.nan),
+    "pressure":  (np.bool_,   lambda s, f: (s, f), False),   # colunas por nº do traste
+    "fret":      (np.int16,   lambda s, f: (s,),   -1),   # −1: corda solta
+    "midi":      (np.int16,   lambda s, f: (s,),   -1),   # −1: sem inferência
+}
+
+
+class FretboardStateStore:
+    def __init__(self, n_frames, n_strings=6, n_frets=25, fps=None, store_dir=None):
+        self.n_frames = n_frames
+        self.n_strings = n_strings
+        self.n_frets = n_frets
+        self.fps = fps
+        self.store_dir = store_dir
+
+        if store_dir is not None:
+            os.makedirs(store_dir, exist_ok=True)
+            self._write_meta()
+
+        self.columns = {
+            name: self._allocate(name, (n_frames, *per_frame(n_strings, n_frets)))
+            for name, (_, per_frame, _) in COLUMNS.items()
+        }
+
+    def _allocate(self, name, shape, path=None):
+        dtype, _, empty = COLUMNS[name]
+        if self.store_dir is None:
+            return np.full(shape, empty, dtype=dtype)
+
+        column = np.lib.format.open_memmap(
+            path or os.path.join(self.store_dir, f"{name}.npy"),
+            mode="w+", dtype=dtype, shape=shape
+        )
+        column[...] = empty
+        return column
+
+    def _grow(self, n_frames):
+        """
+        Amplia todas as colunas para n_frames (o frame_count do vídeo é
+        só uma estimativa). No disco, cada .npy é regravado com o novo
+        tamanho e substitui o anterior; quem abriu o store antes (open)
+        segue mapeando o arquivo antigo, sem erro, e precisa reabrir.
+        Para evitar a ampliação, crie o store com for_video.
+        """
+        print(f"⚠️ Store ampliado de {self.n_frames} para {n_frames} frames")
+
+        for name, old in self.columns.items():
+            shape = (n_frames, *old.shape[1:])
+            if self.store_dir is None:
+                column = self._allocate(name, shape)
+                column[:len(old)] = old
+            else:
+                path = os.path.join(self.store_dir, f"{name}.npy")
+                column = self._allocate(name, shape, path + ".tmp")
+                column[:len(old)] = old
+                column.flush()
+                os.replace(path + ".tmp", path)
+            self.columns[name] = column
+
+        self.n_frames = n_frames
+        if self.store_dir is not None:
+            self._write_meta()
+
+    @classmethod
+    def for_video(cls, frame_count, fps, margin=0.02, margin_sec=2.0, **kwargs):
+        """
+        Store dimensionado a partir dos metadados do contêiner
+        (frame_source.video_info), com folga: CAP_PROP_FRAME_COUNT é uma
+        estimativa e pode ficar abaixo do número real de frames. Frames
+        além da folga ainda ampliam o store (ver _grow), mas isso deve
+        ser a exceção.
+        """
+        n_frames = int(np.ceil(frame_count * (1 + margin) + fps * margin_sec))
+        return cls(n_frames, fps=fps, **kwargs)
+
+    @classmethod
+    def open(cls, store_dir, mode="r"):
+        """
+        Abre um store gravado; mode="r+" permite continuar gravando.
+        Leitores de um store ainda em gravação precisam reabri-lo se ele
+        for ampliado (n_frames em meta.json muda): o mapeamento antigo
+        continua no arquivo substituído, com as colunas curtas.
+        """
+        with open(os.path.join(store_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        store = cls.__new__(cls)
+        store.n_frames = meta["n_frames"]
+        store.n_strings = meta["n_strings"]
+        store.n_frets = meta["n_frets"]
+        store.fps = meta.get("fps")
+        store.store_dir = store_dir
+        store.columns = {
+            name: np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode=mode)
+            for name in COLUMNS
+        }
+        return store
+
+    def _write_meta(self):
+        with open(os.path.join(self.store_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "n_frames": self.n_frames,
+                "n_strings": self.n_strings,
+                "n_frets": self.n_frets,
+                "fps": self.fps,
+            }, f, indent=2)
+
+    def __getattr__(self, name):
+        # store.midi, store.pressure, ... → colunas
+        columns = self.__dict__.get("columns", {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def __len__(self):
+        return self.n_frames
+
+    def record(
+        self,
+        frame_id,
+        timestamp=None,
+        bbox=None,
+        frets=None,
+        strings=None,
+        pressure=None,
+        notes=None
+    ):
+        """
+        Grava o resultado de um frame. Grids/matrizes maiores que o
+        store são truncados; notes é o dict de infer_notes_from_pressure.
+        frame_id além de n_frames amplia o store (com folga, para não
+        regravar a cada frame extra).
+        """
+        if frame_id < 0:
+            raise IndexError(f"frame_id negativo: {frame_id}")
+        if frame_id >= self.n_frames:
+            self._grow(max(frame_id + 1, self.n_frames + max(self.n_frames // 8, 64)))
+
+        c = self.columns
+        c["valid"][frame_id] = True
+
+        if timestamp is not None:
+            c["timestamp"][frame_id] = timestamp
+        elif self.fps:
+            c["timestamp"][frame_id] = frame_id / self.fps
+
+        if bbox is not None:
+            c["bbox"][frame_id] = bbox
+
+        if frets is not None:
+            frets = np.asarray(frets, dtype=np.float32)[:self.n_frets]
+            c["frets_x"][frame_id] = np.nan
+            c["frets_x"][frame_id, :len(frets)] = frets
+
+        if strings is not None:
+            strings = np.asarray(strings, dtype=np.float32)[:self.n_strings]
+            c["strings_y"][frame_id] = np.nan
+            c["strings_y"][frame_id, :len(strings)] = strings
+
+        if pressure is not None:
+            pressure = np.asarray(pressure, dtype=bool)[:self.n_strings, :self.n_frets]
+            c["pressure"][frame_id] = False
+            c["pressure"][frame_id, :pressure.shape[0], :pressure.shape[1]] = pressure
+
+        if notes is not None:
+            for string_id, note in notes.items():
+                if string_id >= self.n_strings:
+                    continue
+                c["fret"][frame_id, string_id] = -1 if note["fret"] is None else note["fret"]
+                c["midi"][frame_id, string_id] = note["midi"]
+
+    def flush(self):
+        for column in self.columns.values():
+            if isinstance(column, np.memmap):
+                column.flush()
+
+    def times(self, start=0, end=None):
+        """
+        Timestamps da fatia; frames sem timestamp usam frame_id / fps.
+        """
+        end = self.n_frames if end is None else end
+        ts = np.array(self.columns["timestamp"][start:end], dtype=np.float64)
+        if self.fps:
+            missing = np.isnan(ts)
+            ts[missing] = np.arange(start, end)[missing] / self.fps
+        return ts
+
+    def state(self, frame_id):
+        """
+        FretboardState de um frame (sem imagem), para código que ainda
+        consome os dataclasses.
+        """
+        c = self.columns
+        xs = c["frets_x"][frame_id]
+        ys = c["strings_y"][frame_id]
+
+        return FretboardState(
+            frame_index=frame_id,
+            rectified_image=None,
+            bbox_original=tuple(int(v) for v in c["bbox"][frame_id]),
+            frets=[Fret(index=i, x=int(x)) for i, x in enumerate(xs) if not np.isnan(x)],
+            strings=[String(index=i, y=int(y)) for i, y in enumerate(ys) if not np.isnan(y)]
+        )
+
+
+def infer_store_notes(store, tuning="standard", capo=0, start=0, end=None, chunk=4096):
+    """
+    Preenche as colunas midi/fret a partir da coluna pressure, em
+    blocos de `chunk` frames (uma passada NumPy por bloco).
+    Só frames processados (com grid gravado) são escritos; os que só
+    herdaram notas no modo esparso mantêm as notas herdadas.
+    """
+    end = store.n_frames if end is None else end
+
+    for a in range(start, end, chunk):
+        b = min(a + chunk, end)
+        midi, fret = infer_notes_batch(store.pressure[a:b], tuning, capo)
+
+        k = min(midi.shape[1], store.n_strings)
+        processed = np.asarray(store.valid[a:b]) & ~np.isnan(store.frets_x[a:b]).all(axis=1)
+        store.midi[a:b, :k] = np.where(processed[:, None], midi[:, :k], store.midi[a:b, :k])
+        store.fret[a:b, :k] = np.where(processed[:, None], fret[:, :k], store.fret[a:b, :k])
+
+    store.flush()
+
+
+def build_video_timeline(store, out_path=None, start=0, end=None, min_frames=2):
+    """
+    Timeline de vídeo a partir das colunas midi/fret: um evento por
+    trecho contíguo de frames válidos com as mesmas notas em todas as
+    cordas, no formato lido por fusion_audio_video.fuse_timelines
+    (inicio, fim, tipo, data).
+    """
+    end = store.n_frames if end is None else end
+
+    valid = np.asarray(store.valid[start:end])
+    midi = np.asarray(store.midi[start:end])
+    fret = np.asarray(store.fret[start:end])
+    times = store.times(start, end)
+
+    if len(valid) == 0:
+        return []
+
+    # Fronteiras: mudança de notas ou de validade
+    changed = np.any(midi[1:] != midi[:-1], axis=1) | (valid[1:] != valid[:-1])
+    bounds = np.concatenate([[0], np.flatnonzero(changed) + 1, [len(valid)]])
+
+    # Duração do último frame: passo mediano entre timestamps
+    step = float(np.nanmedian(np.diff(times))) if len(times) > 1 else 0.0
+
+    events = []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        if not valid[a] or b - a < min_frames:
+            continue
+
+        t_end = times[b] if b < len(times) else times[b - 1] + step
+        events.append({
+            "inicio": float(times[a]),
+            "fim": float(t_end),
+            "tipo": "video",
+            "data": {
+                "frames": [int(start + a), int(start + b)],
+                "midi": midi[a].tolist(),
+                "frets": fret[a].tolist(),
+                "notes": [midi_to_note(int(m)) if m >= 0 else None for m in midi[a]],
+            },
+        })
+
+    if out_path is not None:
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(events, f, indent=2, ensure_ascii=False)
+        print(f"🎬 Timeline de vídeo salva em: {out_path}")
+
+    return events
@@ -4,7 +4,14 @@ import numpy as np
 
 
 class HandDetector:
-    def __init__(self):
+    def __init__(self, max_side=320, roi_margin=1.0, hand_margin=0.3):
+        """
+        A inferência roda só num recorte reduzido (lado maior ≤ max_side):
+          - em torno da bbox da mão do frame anterior (hand_margin), ou
+          - em torno da ROI da escala (roi_margin), ou
+          - no frame inteiro, sem nenhuma das duas
+        As margens são frações do menor lado da bbox.
+        """
         self.mp_hands = mp.solutions.hands
         self.hands = self.mp_hands.Hands(
             static_image_mode=False,
@@ -13,32 +20,159 @@ class HandDetector:
             min_tracking_confidence=0.6
         )
 
-    def detect(self, frame):
+        self.max_side = max_side
+        self.roi_margin = roi_margin
+        self.hand_margin = hand_margin
+
+        # bbox da mão no último frame (coordenadas do frame)
+        self.prev_bbox = None
+
+    def _crop_region(self, shape, roi_bbox=None, origin=(0, 0)):
+        h, w = shape[:2]
+
+        if self.prev_bbox is not None:
+            bbox, margin = self.prev_bbox, self.hand_margin
+        elif roi_bbox is not None:
+            bbox, margin = roi_bbox, self.roi_margin
+        else:
+            return 0, 0, w, h
+
+        ox, oy = origin
+        x1, y1, x2, y2 = bbox[0] - ox, bbox[1] - oy, bbox[2] - ox, bbox[3] - oy
+        pad = margin * min(x2 - x1, y2 - y1)
+
+        return (
+            int(max(0, x1 - pad)),
+            int(max(0, y1 - pad)),
+            int(min(w, x2 + pad)),
+            int(min(h, y2 + pad))
+        )
+
+    def detect_landmarks(self, frame, roi_bbox=None, origin=(0, 0)):
+        """
+        Retorna os 21 landmarks (21, 2) em pixels do frame, ou None.
+        origin: canto (x, y) de `frame` no frame original, quando só um
+        recorte é recebido (ex.: hand_worker); bboxes e landmarks
+        continuam em coordenadas do frame original.
+        """
+        cx1, cy1, cx2, cy2 = self._crop_region(frame.shape, roi_bbox, origin)
+        crop = frame[cy1:cy2, cx1:cx2]
+        if crop.size == 0:
+            self.prev_bbox = None
+            return None
+
+        ch, cw = crop.shape[:2]
+        scale = min(1.0, self.max_side / max(ch, cw))
+        if scale < 1.0:
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        result = self.hands.process(rgb)
+
+        if not result.multi_hand_landmarks:
+            self.prev_bbox = None
+            return None
+
+        hand = result.multi_hand_landmarks[0]
+
+        # Landmarks normalizados no recorte → pixels do frame
+        pts = np.array(
+            [(lm.x * cw + cx1 + origin[0], lm.y * ch + cy1 + origin[1]) for lm in hand.landmark],
+            dtype=np.float32
+        )
+
+        x1, y1 = pts.min(axis=0)
+        x2, y2 = pts.max(axis=0)
+        self.prev_bbox = (int(x1), int(y1), int(x2), int(y2))
+
+        return pts
+
+    def detect(self, frame, roi_bbox=None):
         """
         Retorna:
           - mask (binária)
           - bbox (x1, y1, x2, y2) ou None
         """
-
         h, w = frame.shape[:2]
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result = self.hands.process(rgb)
-
-        mask = np.zeros((h, w), dtype=np.uint8)
+        pts = self.detect_landmarks(frame, roi_bbox)
 
-        if not result.multi_hand_landmarks:
+        mask = hand_mask_from_landmarks(pts, (h, w))
+        if pts is None:
             return mask, None
 
-        hand = result.multi_hand_landmarks[0]
+        return mask, self.prev_bbox
+
+
+# ----------------------------
+# Instância única, reaproveitada entre frames
+# (o Hands do MediaPipe mantém estado de rastreamento)
+# ----------------------------
+_detector = None
+
+
+def get_hand_detector():
+    global _detector
+    if _detector is None:
+        _detector = HandDetector()
+    return _detector
 
-        pts = []
-        for lm in hand.landmark:
-            pts.append((int(lm.x * w), int(lm.y * h)))
 
-        hull = cv2.convexHull(np.array(pts))
-        cv2.fillConvexPoly(mask, hull, 255)
+def landmarks_to_fretboard(landmarks, roi_bbox, H=None):
+    """
+    Landmarks em pixels do frame → coordenadas da escala:
+    desloca pela origem da ROI e aplica a homografia ROI → escala
+    (ex.: H_pre ou H_total de fretboard_main).
+    """
+    if landmarks is None:
+        return None
 
-        x, y, bw, bh = cv2.boundingRect(hull)
-        bbox = (x, y, x + bw, y + bh)
+    pts = landmarks - np.float32(roi_bbox[:2])
+    if H is None:
+        return pts
+
+    return cv2.perspectiveTransform(
+        pts.reshape(-1, 1, 2), np.asarray(H, dtype=np.float64)
+    ).reshape(-1, 2)
+
+
+def hand_mask_from_landmarks(landmarks, shape):
+    """
+    Máscara binária (casco convexo dos landmarks) com o tamanho `shape`.
+    """
+    mask = np.zeros(shape[:2], dtype=np.uint8)
+    if landmarks is None:
+        return mask
+
+    hull = cv2.convexHull(np.round(landmarks).astype(np.int32))
+    cv2.fillConvexPoly(mask, hull, 255)
+    return mask
+
+
+def detect_hand_landmarks(frame, roi_bbox=None, H=None):
+    """
+    Landmarks da mão no espaço da escala (com roi_bbox) ou do frame.
+    """
+    landmarks = get_hand_detector().detect_landmarks(frame, roi_bbox)
+    if roi_bbox is None:
+        return landmarks
+    return landmarks_to_fretboard(landmarks, roi_bbox, H)
+
+
+def detect_hand_mask(frame, roi_bbox=None, H=None, size=None):
+    """
+    Máscara da mão já no espaço da escala.
+    - frame: frame completo (a inferência usa só o recorte em torno da ROI)
+    - roi_bbox: bbox da escala no frame
+    - H: homografia ROI → escala; size: (w, h) da imagem da escala
+    Sem roi_bbox, a máscara é do tamanho do próprio frame.
+    """
+    landmarks = detect_hand_landmarks(frame, roi_bbox, H)
+
+    if size is None:
+        shape = frame.shape[:2] if roi_bbox is None else (
+            roi_bbox[3] - roi_bbox[1], roi_bbox[2] - roi_bbox[0]
+        )
+    else:
+        shape = (size[1], size[0])
 
-        return mask, bbox
+    return hand_mask_from_landmarks(landmarks, shape)
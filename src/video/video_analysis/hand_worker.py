@@ -0,0 +1,169 @@
+"""
+hand_worker.py
+- Inferência do MediaPipe Hands num processo dedicado e persistente,
+  com a própria instância de HandDetector
+- O processo principal envia o recorte em torno da ROI assim que ela é
+  conhecida e segue com a geometria (trastes/cordas) enquanto a mão é
+  inferida; o resultado é buscado depois, pelo ticket do envio
+- Um único worker com fila FIFO: os frames são processados na ordem de
+  envio, preservando o estado de rastreamento temporal do MediaPipe
+- Se o processo morrer ou parar de responder, os tickets pendentes e os
+  próximos envios são inferidos no próprio processo (get_hand_detector)
+"""
+
+import queue
+import time
+from multiprocessing import get_context
+
+import numpy as np
+
+from hand_detector import HandDetector, get_hand_detector
+
+
+def _worker_loop(requests, results, detector_kwargs):
+    detector = HandDetector(**detector_kwargs)
+
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+
+        ticket, crop, origin, roi_bbox = item
+        try:
+            landmarks = detector.detect_landmarks(crop, roi_bbox, origin)
+            results.put((ticket, landmarks, None))
+        except Exception as e:
+            results.put((ticket, None, str(e)))
+
+
+class HandWorker:
+    def __init__(self, max_pending=4, roi_margin=1.0, timeout_s=10.0, **detector_kwargs):
+        """
+        - max_pending: envios sem resultado buscado antes de submit bloquear
+        - roi_margin: margem do recorte enviado (fração do menor lado
+          da ROI); o recorte final da mão é escolhido dentro dele
+        - timeout_s: espera máxima por um resultado (ou por vaga na fila)
+          antes de abandonar o worker e inferir no próprio processo
+        """
+        self.roi_margin = roi_margin
+        self.timeout_s = timeout_s
+        self.broken = False
+        detector_kwargs.setdefault("roi_margin", roi_margin)
+
+        ctx = get_context("spawn")
+        self._requests = ctx.Queue(maxsize=max_pending)
+        self._results = ctx.Queue()
+        self._process = ctx.Process(
+            target=_worker_loop,
+            args=(self._requests, self._results, detector_kwargs),
+            daemon=True
+        )
+        self._process.start()
+
+        self._next_ticket = 0
+        self._ready = {}
+        # Recortes ainda sem resultado, para o fallback local
+        self._inputs = {}
+
+    def _crop(self, frame, roi_bbox):
+        if roi_bbox is None:
+            return frame, (0, 0)
+
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = roi_bbox
+        pad = self.roi_margin * min(x2 - x1, y2 - y1)
+
+        cx1, cy1 = int(max(0, x1 - pad)), int(max(0, y1 - pad))
+        cx2, cy2 = int(min(w, x2 + pad)), int(min(h, y2 + pad))
+
+        # Cópia contígua: só o recorte atravessa o pipe
+        return np.ascontiguousarray(frame[cy1:cy2, cx1:cx2]), (cx1, cy1)
+
+    def submit(self, frame, roi_bbox=None):
+        """
+        Envia o frame (recortado em torno da ROI) e retorna um ticket.
+        """
+        crop, origin = self._crop(frame, roi_bbox)
+
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        self._inputs[ticket] = (crop, origin, roi_bbox)
+
+        if not self.broken:
+            try:
+                self._requests.put((ticket, crop, origin, roi_bbox), timeout=self.timeout_s)
+            except queue.Full:
+                self._abandon("fila cheia")
+
+        return ticket
+
+    def _abandon(self, reason):
+        """
+        Desiste do processo: os tickets pendentes passam a ser inferidos
+        localmente em result().
+        """
+        if not self.broken:
+            print(f"⚠️ Worker de mão indisponível ({reason}); inferindo no processo principal")
+        self.broken = True
+
+    def _detect_inline(self, ticket):
+        crop, origin, roi_bbox = self._inputs[ticket]
+        return get_hand_detector().detect_landmarks(crop, roi_bbox, origin)
+
+    def result(self, ticket):
+        """
+        Landmarks (21, 2) em pixels do frame, ou None. Bloqueia até o
+        resultado do ticket chegar (no máximo timeout_s; depois disso,
+        ou com o processo morto, infere localmente).
+        """
+        deadline = time.monotonic() + self.timeout_s
+
+        while ticket not in self._ready and not self.broken:
+            try:
+                t, landmarks, error = self._results.get(timeout=0.5)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    self._abandon(f"processo encerrado, exitcode={self._process.exitcode}")
+                elif time.monotonic() > deadline:
+                    self._abandon(f"sem resposta em {self.timeout_s:.0f}s")
+                continue
+
+            if error is not None:
+                # Falha num frame isolado: sem mão nesse frame
+                print(f"⚠️ Worker de mão falhou no ticket {t}: {error}")
+            self._ready[t] = landmarks
+            self._inputs.pop(t, None)
+
+        if ticket in self._ready:
+            return self._ready.pop(ticket)
+
+        landmarks = self._detect_inline(ticket)
+        del self._inputs[ticket]
+        return landmarks
+
+    def close(self):
+        if self._process.is_alive():
+            try:
+                self._requests.put(None, timeout=self.timeout_s)
+            except queue.Full:
+                self._process.terminate()
+            self._process.join(timeout=5)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+_worker = None
+
+
+def get_hand_worker():
+    """
+    Worker único, criado sob demanda (spawn só quando usado).
+    """
+    global _worker
+    if _worker is None:
+        _worker = HandWorker()
+    return _worker
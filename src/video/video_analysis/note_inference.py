@@ -1,5 +1,7 @@
 # note_inference.py
 
+import numpy as np
+
 NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F",
               "F#", "G", "G#", "A", "A#", "B"]
 
@@ -12,6 +14,50 @@ STANDARD_TUNING = {
     5: ("E", 64)   # Prima
 }
 
+DROP_D_TUNING = {
+    0: ("D", 38),
+    1: ("A", 45),
+    2: ("D", 50),
+    3: ("G", 55),
+    4: ("B", 59),
+    5: ("E", 64)
+}
+
+SEVEN_STRING_TUNING = {
+    0: ("B", 35),
+    1: ("E", 40),
+    2: ("A", 45),
+    3: ("D", 50),
+    4: ("G", 55),
+    5: ("B", 59),
+    6: ("E", 64)
+}
+
+TUNINGS = {
+    "standard": STANDARD_TUNING,
+    "drop_d": DROP_D_TUNING,
+    "seven_string": SEVEN_STRING_TUNING,
+}
+
+
+def get_tuning(tuning):
+    """
+    Nome registrado em TUNINGS ou o próprio dict {string_id: (nota, midi)}.
+    """
+    if isinstance(tuning, str):
+        if tuning not in TUNINGS:
+            raise ValueError(f"Afinação desconhecida: {tuning} (disponíveis: {list(TUNINGS)})")
+        return TUNINGS[tuning]
+    return tuning
+
+
+def open_string_midi(tuning):
+    """
+    MIDI das cordas soltas, na ordem dos string_id.
+    """
+    tuning = get_tuning(tuning)
+    return np.array([tuning[i][1] for i in sorted(tuning)], dtype=np.int16)
+
 
 def midi_to_note(midi):
     return NOTE_NAMES[midi % 12]
@@ -32,7 +78,7 @@ def infer_notes_from_pressure(pressure_map, tuning=STANDARD_TUNING):
 
     notes = {}
 
-    for string_id, (open_note, open_midi) in tuning.items():
+    for string_id, (open_note, open_midi) in get_tuning(tuning).items():
         pressed_frets = pressure_map.get(string_id, [])
 
         if not pressed_frets:
@@ -49,3 +95,56 @@ def infer_notes_from_pressure(pressure_map, tuning=STANDARD_TUNING):
         }
 
     return notes
+
+
+def infer_notes_batch(pressure, tuning="standard", capo=0):
+    """
+    Inferência vetorizada para vários frames.
+
+    Entrada:
+      pressure: (frames, strings, frets) booleano; traste i ⇒ fret i
+      tuning: nome em TUNINGS ou dict; capo: traste do capotraste
+
+    Saída:
+      midi (frames, n_cordas_da_afinação) e fret (idem; −1 = solta).
+      Cordas da afinação sem linha em pressure ficam soltas; linhas
+      além da afinação são ignoradas.
+    """
+    pressure = np.asarray(pressure, dtype=bool)
+    base = open_string_midi(tuning)
+
+    n_frames, n_rows, n_frets = pressure.shape
+    n_strings = len(base)
+
+    rows = np.zeros((n_frames, n_strings, n_frets), dtype=bool)
+    k = min(n_rows, n_strings)
+    rows[:, :k] = pressure[:, :k]
+
+    if n_frets == 0:
+        fret = np.full((n_frames, n_strings), -1, dtype=np.int16)
+        return np.broadcast_to(base + capo, fret.shape).astype(np.int16), fret
+
+    # Traste pressionado mais alto: argmax no eixo invertido
+    reversed_frets = rows[..., ::-1]
+    highest = n_frets - 1 - reversed_frets.argmax(axis=-1)
+    pressed = reversed_frets.any(axis=-1) & (highest >= capo)
+
+    fret = np.where(pressed, highest, -1).astype(np.int16)
+    midi = (base[None, :] + np.where(pressed, highest, capo)).astype(np.int16)
+
+    return midi, fret
+
+
+def notes_from_arrays(midi, fret):
+    """
+    Uma linha (strings,) de infer_notes_batch → o dict de
+    infer_notes_from_pressure.
+    """
+    return {
+        string_id: {
+            "fret": None if f < 0 else int(f),
+            "midi": int(m),
+            "note": midi_to_note(int(m))
+        }
+        for string_id, (m, f) in enumerate(zip(midi, fret))
+    }
@@ -0,0 +1,49 @@
+import numpy as np
+import librosa
+
+
+def detect_onsets(y, sr, hop_length=512):
+    """
+    Tempos (s) dos transientes do áudio, a partir da mesma
+    força de onset exibida em audio_visualization.plot_onset_strength.
+    """
+    onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length)
+
+    return librosa.onset.onset_detect(
+        onset_envelope=onset_env,
+        sr=sr,
+        hop_length=hop_length,
+        units="time"
+    )
+
+
+def select_frames(
+    onset_times,
+    fps,
+    frame_count,
+    frames_after_onset=3,
+    onset_delay_s=0.03,
+    background_hz=1.0
+):
+    """
+    Escolhe quais frames de vídeo devem ser decodificados e processados.
+
+    - alguns frames logo após cada onset (a mão já assentou na nota)
+    - uma amostragem de fundo de baixa taxa (background_hz)
+
+    Retorna um array ordenado de índices de frame.
+    """
+    onset_frames = np.round(
+        (np.asarray(onset_times, dtype=float) + onset_delay_s) * fps
+    ).astype(int)
+
+    after = (onset_frames[:, None] + np.arange(frames_after_onset)[None, :]).ravel()
+
+    if background_hz > 0:
+        step = max(1, int(round(fps / background_hz)))
+        background = np.arange(0, frame_count, step)
+    else:
+        background = np.array([], dtype=int)
+
+    selected = np.unique(np.concatenate([after, background]))
+    return selected[(selected >= 0) & (selected < frame_count)]
@@ -1,31 +1,97 @@
+import time
+
 import cv2
 import numpy as np
 from collections import deque
 
+# Índice LSH do FLANN para descritores binários (ORB)
+FLANN_INDEX_LSH = 6
+
+
 class ORBStabilizer:
-    def __init__(self, max_history=5):
-        self.orb = cv2.ORB_create(1500)
-        self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+    def __init__(
+        self,
+        max_history=5,
+        fast=False,
+        scale=0.5,
+        n_features=1500,
+        max_matches=200,
+        ratio=0.75
+    ):
+        """
+        fast=True:
+          - detecção/matching num nível reduzido da pirâmide (scale)
+          - FLANN LSH + ratio test no lugar do BFMatcher com cross-check
+          - no máximo max_matches correspondências entram no RANSAC
+          - a homografia é reescalada para a resolução original
+        """
+        self.fast = fast
+        self.scale = scale
+        self.max_matches = max_matches
+        self.ratio = ratio
+
+        if fast:
+            self.orb = cv2.ORB_create(n_features // 2)
+            self.matcher = cv2.FlannBasedMatcher(
+                dict(algorithm=FLANN_INDEX_LSH, table_number=6, key_size=12, multi_probe_level=1),
+                dict(checks=32)
+            )
+        else:
+            self.orb = cv2.ORB_create(n_features)
+            self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
 
         self.prev_kp = None
         self.prev_des = None
         self.H_history = deque(maxlen=max_history)
 
-    def stabilize(self, frame, mask=None):
+        # Qualidade da última estimativa:
+        # matches, inlier_ratio, reprojection_error (px, resolução original)
+        self.last_quality = None
+
+    def _match(self, des):
+        if not self.fast:
+            matches = self.matcher.match(self.prev_des, des)
+            return sorted(matches, key=lambda m: m.distance)
+
+        pairs = self.matcher.knnMatch(self.prev_des, des, k=2)
+
+        # Ratio test (LSH pode devolver menos de 2 vizinhos)
+        good = [
+            p[0] for p in pairs
+            if len(p) == 2 and p[0].distance < self.ratio * p[1].distance
+        ]
+
+        if len(good) > self.max_matches:
+            distances = np.array([m.distance for m in good])
+            keep = np.argpartition(distances, self.max_matches)[:self.max_matches]
+            good = [good[i] for i in keep]
+
+        return good
+
+    def estimate(self, frame, mask=None):
+        """
+        Estima a homografia de estabilização (suavizada) sem reamostrar o frame.
+        Retorna H_smooth ou None.
+        """
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
+        scale = self.scale if self.fast else 1.0
+        if scale != 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            if mask is not None:
+                mask = cv2.resize(mask, (gray.shape[1], gray.shape[0]), interpolation=cv2.INTER_NEAREST)
+
         kp, des = self.orb.detectAndCompute(gray, mask)
 
         if des is None or self.prev_des is None:
             self.prev_kp = kp
             self.prev_des = des
-            return frame, None
+            return None
 
-        matches = self.matcher.match(self.prev_des, des)
-        matches = sorted(matches, key=lambda m: m.distance)
+        matches = self._match(des)
 
         if len(matches) < 12:
-            return frame, None
+            return None
 
         src_pts = np.float32(
             [self.prev_kp[m.queryIdx].pt for m in matches]
@@ -36,20 +102,76 @@ class ORBStabilizer:
         ).reshape(-1, 1, 2)
 
         H, inliers = cv2.findHomography(
-            dst_pts, src_pts, cv2.RANSAC, 4.0
+            dst_pts, src_pts, cv2.RANSAC, 4.0 * scale
         )
 
         if H is None:
-            return frame, None
+            return None
+
+        # Métrica de qualidade (erro de reprojeção dos inliers)
+        inl = inliers.ravel() == 1
+        reproj = cv2.perspectiveTransform(dst_pts[inl], H)
+        error = np.linalg.norm((reproj - src_pts[inl]).reshape(-1, 2), axis=1)
+
+        self.last_quality = {
+            "matches": len(matches),
+            "inlier_ratio": float(inl.mean()),
+            "reprojection_error": float(error.mean() / scale) if len(error) else None,
+        }
+
+        # Volta para a resolução original: H_full = S⁻¹ · H · S
+        if scale != 1.0:
+            S = np.diag([scale, scale, 1.0])
+            H = np.linalg.inv(S) @ H @ S
 
         # Suavização temporal
         self.H_history.append(H)
         H_smooth = np.mean(self.H_history, axis=0)
 
-        h, w = frame.shape[:2]
-        stabilized = cv2.warpPerspective(frame, H_smooth, (w, h))
-
         self.prev_kp = kp
         self.prev_des = des
 
+        return H_smooth
+
+    def stabilize(self, frame, mask=None):
+        H_smooth = self.estimate(frame, mask)
+        if H_smooth is None:
+            return frame, None
+
+        h, w = frame.shape[:2]
+        stabilized = cv2.warpPerspective(frame, H_smooth, (w, h))
+
         return stabilized, H_smooth
+
+
+def compare_stabilizers(frames, **fast_kwargs):
+    """
+    Roda o modo original e o rápido sobre a mesma sequência de ROIs.
+    Retorna, por modo: ms/frame, inlier_ratio e erro de reprojeção médios.
+    """
+    report = {}
+
+    for name, stabilizer in (
+        ("full", ORBStabilizer()),
+        ("fast", ORBStabilizer(fast=True, **fast_kwargs)),
+    ):
+        qualities = []
+        t0 = time.perf_counter()
+
+        for frame in frames:
+            stabilizer.stabilize(frame)
+            if stabilizer.last_quality is not None:
+                qualities.append(stabilizer.last_quality)
+            stabilizer.last_quality = None
+
+        elapsed = time.perf_counter() - t0
+        errors = [q["reprojection_error"] for q in qualities if q["reprojection_error"] is not None]
+
+        report[name] = {
+            "ms_per_frame": 1000 * elapsed / max(len(frames), 1),
+            "inlier_ratio": float(np.mean([q["inlier_ratio"] for q in qualities])) if qualities else None,
+            "reprojection_error": float(np.mean(errors)) if errors else None,
+        }
+        print(f"🎯 {name}: {report[name]}")
+
+    return report
@@ -1,39 +1,170 @@
 import numpy as np
 
 
-def build_pressure_map(hand_mask, frets, strings, tolerance_px=5):
+# Índices dos landmarks de ponta de dedo do MediaPipe Hands
+# (indicador, médio, anelar, mínimo; o polegar fica atrás do braço)
+FINGERTIPS = (8, 12, 16, 20)
+
+
+def integral_image(masks):
     """
-    Retorna:
-      pressure_map[string_id] = [frets pressionados]
+    Tabela de somas acumuladas (summed-area table) de uma máscara (h, w)
+    ou de uma pilha (N, h, w), com uma linha/coluna de zeros à frente:
+    sat[..., y, x] = número de pixels > 0 em mask[..., :y, :x].
+    """
+    masks = np.asarray(masks) > 0
+    sat = np.zeros(masks.shape[:-2] + (masks.shape[-2] + 1, masks.shape[-1] + 1), dtype=np.int32)
+    sat[..., 1:, 1:] = masks.cumsum(axis=-2, dtype=np.int32).cumsum(axis=-1, dtype=np.int32)
+    return sat
 
-    A pressão é detectada se a mão cobre
-    a região próxima à interseção corda × traste.
+
+def _window_bounds(coords, tolerance_px, size):
+    # Mesmo recorte de antes: coordenada truncada, janela [c − tol, c + tol)
+    c = np.asarray(coords, dtype=float).astype(int)
+    return np.clip(c - tolerance_px, 0, size), np.clip(c + tolerance_px, 0, size)
+
+
+def _window_sums(sat, frets, strings, tolerance_px):
+    """
+    Soma da máscara na janela de cada interseção corda × traste,
+    por consulta direta à tabela (4 leituras por janela).
+    sat: (N, h+1, w+1); frets (F,) ou (N, F); strings (S,) ou (N, S).
+    Retorna (N, S, F).
     """
+    n = sat.shape[0]
+    h, w = sat.shape[1] - 1, sat.shape[2] - 1
 
-    pressure_map = {}
+    x1, x2 = _window_bounds(frets, tolerance_px, w)
+    y1, y2 = _window_bounds(strings, tolerance_px, h)
 
-    h, w = hand_mask.shape[:2]
+    # Coordenadas compartilhadas por todos os frames → (N, ·)
+    x1, x2 = (np.broadcast_to(a, (n, a.shape[-1])) for a in (x1, x2))
+    y1, y2 = (np.broadcast_to(a, (n, a.shape[-1])) for a in (y1, y2))
 
-    for si, y in enumerate(strings):
-        y = int(y)
-        pressed_frets = []
+    f = np.arange(n)[:, None, None]
 
-        for fi, x in enumerate(frets):
-            x = int(x)
+    def at(ys, xs):
+        return sat[f, ys[:, :, None], xs[:, None, :]]
 
-            x_min = max(0, x - tolerance_px)
-            x_max = min(w, x + tolerance_px)
-            y_min = max(0, y - tolerance_px)
-            y_max = min(h, y + tolerance_px)
+    return at(y2, x2) - at(y1, x2) - at(y2, x1) + at(y1, x1)
 
-            region = hand_mask[y_min:y_max, x_min:x_max]
 
-            if region.size == 0:
-                continue
+def build_pressure_matrix(hand_mask, frets, strings, tolerance_px=5):
+    """
+    Matriz booleana (n_strings, n_frets): True se a mão cobre a janela
+    de ±tolerance_px em torno da interseção corda × traste.
+    """
+    sat = integral_image(hand_mask)[None]
+    return _window_sums(sat, frets, strings, tolerance_px)[0] > 0
+
+
+def build_pressure_matrices(hand_masks, frets, strings, tolerance_px=5):
+    """
+    Versão em lote: hand_masks (N, h, w) → (N, n_strings, n_frets).
+    frets/strings podem ser compartilhados ((F,), (S,)) ou por frame
+    ((N, F), (N, S)).
+    """
+    sat = integral_image(hand_masks)
+    return _window_sums(sat, frets, strings, tolerance_px) > 0
+
+
+def pressure_matrix_to_map(matrix):
+    """
+    (n_strings, n_frets) → pressure_map[string_id] = [frets pressionados],
+    o formato esperado por infer_notes_from_pressure.
+    """
+    matrix = np.asarray(matrix, dtype=bool)
+    return {si: np.flatnonzero(row).tolist() for si, row in enumerate(matrix)}
 
-            if np.any(region > 0):
-                pressed_frets.append(fi)
 
-        pressure_map[si] = pressed_frets
+def pressure_map_to_matrix(pressure_map, n_strings, n_frets):
+    matrix = np.zeros((n_strings, n_frets), dtype=bool)
+    for si, pressed in pressure_map.items():
+        matrix[si, pressed] = True
+    return matrix
 
-    return pressure_map
+
+def pressure_by_fret_number(matrix, fret_numbers, n_frets=25):
+    """
+    (n_strings, n_linhas), colunas na ordem das linhas de traste →
+    (n_strings, n_frets), coluna = número absoluto do traste
+    (traste i ⇒ fret i, como em infer_notes_batch).
+    Linhas sem número (−1) são descartadas; números repetidos viram OU.
+    """
+    matrix = np.asarray(matrix, dtype=bool)
+    fret_numbers = np.asarray(fret_numbers, dtype=int)
+
+    out = np.zeros((matrix.shape[0], n_frets), dtype=bool)
+    keep = (fret_numbers >= 0) & (fret_numbers < n_frets)
+    np.logical_or.at(out, (slice(None), fret_numbers[keep]), matrix[:, keep])
+    return out
+
+
+def fingertip_pressure_matrix(
+    landmarks,
+    frets,
+    strings,
+    fingertips=FINGERTIPS,
+    string_tolerance_px=None,
+    nut_on_left=True
+):
+    """
+    Pressão direto das pontas dos dedos, sem máscara da mão.
+
+    - landmarks: (21, 2) já no espaço da escala (landmarks_to_fretboard)
+    - frets/strings: posições x/y no mesmo espaço
+    - cada ponta cai na casa entre dois trastes (busca binária em frets)
+      e na corda mais próxima (busca binária em strings), se estiver a
+      até string_tolerance_px dela (padrão: metade do espaçamento mediano)
+    - a casa é marcada no traste do lado da ponte, como no mapa por
+      máscara (traste i ⇒ fret i em infer_notes_from_pressure)
+
+    Retorna a matriz booleana (n_strings, n_frets), na ordem de
+    frets/strings recebida.
+    """
+    frets = np.asarray(frets, dtype=float)
+    strings = np.asarray(strings, dtype=float)
+    matrix = np.zeros((len(strings), len(frets)), dtype=bool)
+
+    if landmarks is None or len(frets) < 2 or len(strings) == 0:
+        return matrix
+
+    tips = np.asarray(landmarks, dtype=float)[list(fingertips)]
+    x, y = tips[:, 0], tips[:, 1]
+
+    fret_order = np.argsort(frets)
+    string_order = np.argsort(strings)
+    fx = frets[fret_order]
+    sy = strings[string_order]
+
+    # Casa: entre fx[i-1] e fx[i]
+    cell = np.searchsorted(fx, x)
+    inside = (cell > 0) & (cell < len(fx))
+    col = cell if nut_on_left else cell - 1
+
+    # Corda mais próxima: candidatas j-1 e j
+    j = np.clip(np.searchsorted(sy, y), 1, max(len(sy) - 1, 1))
+    below = np.clip(j - 1, 0, len(sy) - 1)
+    above = np.clip(j, 0, len(sy) - 1)
+    nearest = np.where(np.abs(y - sy[below]) <= np.abs(y - sy[above]), below, above)
+
+    if string_tolerance_px is None:
+        spacing = np.median(np.diff(sy)) if len(sy) > 1 else np.inf
+        string_tolerance_px = spacing / 2
+    inside &= np.abs(y - sy[nearest]) <= string_tolerance_px
+
+    matrix[string_order[nearest[inside]], fret_order[col[inside]]] = True
+    return matrix
+
+
+def build_pressure_map(hand_mask, frets, strings, tolerance_px=5):
+    """
+    Retorna:
+      pressure_map[string_id] = [frets pressionados]
+
+    A pressão é detectada se a mão cobre
+    a região próxima à interseção corda × traste.
+    """
+    return pressure_matrix_to_map(
+        build_pressure_matrix(hand_mask, frets, strings, tolerance_px)
+    )
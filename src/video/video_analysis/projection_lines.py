@@ -0,0 +1,309 @@
+"""
+projection_lines.py
+- Detector de trastes/cordas por perfis de projeção 1D
+- Após a retificação, trastes são verticais e cordas horizontais:
+  o gradiente horizontal somado por coluna tem picos nos trastes e o
+  gradiente vertical somado por linha tem picos nas cordas
+- Alternativa rápida ao Canny + HoughLinesP de detect_frets/detect_strings,
+  com a mesma saída (Fret / String de fretboard_state)
+"""
+
+import os
+import time
+
+import cv2
+import numpy as np
+
+from fretboard_state import Fret, String
+
+
+def gradient_profiles(img, smooth=5):
+    """
+    Retorna (perfil_colunas, perfil_linhas), ambos normalizados em [0, 1].
+    - perfil_colunas[x]: média de |∂I/∂x| na coluna x (trastes)
+    - perfil_linhas[y]: média de |∂I/∂y| na linha y (cordas)
+
+    Diferença central: as duas bordas de uma linha ficam simétricas em
+    torno do centro dela (a diferença adiantada desloca tudo meio pixel).
+    """
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    gray = gray.astype(np.float32)
+
+    cols = np.abs(np.gradient(gray, axis=1)).mean(axis=0)
+    rows = np.abs(np.gradient(gray, axis=0)).mean(axis=1)
+
+    return _normalize(_smooth(cols, smooth)), _normalize(_smooth(rows, smooth))
+
+
+def _smooth(profile, k):
+    if k <= 1:
+        return profile
+    kernel = np.ones(k, dtype=np.float32) / k
+    return np.convolve(profile, kernel, mode="same")
+
+
+def _normalize(profile):
+    # Remove a linha de base (mediana) e escala pelo máximo
+    profile = np.clip(profile - np.median(profile), 0, None)
+    peak = profile.max() if len(profile) else 0.0
+    return profile / peak if peak > 0 else profile
+
+
+def find_peaks(profile, min_distance=8, min_height=0.3, max_peaks=None):
+    """
+    Posições das linhas em um perfil 1D, ordenadas (float, subpixel).
+
+    As duas bordas de uma linha viram um só morro, de topo achatado
+    (e, com ruído, partido em dois máximos). Cada linha fica no centro
+    da largura a meia altura do seu morro; máximos dentro de um morro
+    já aceito, ou a menos de min_distance de um pico mais alto, são
+    descartados.
+    """
+    p = np.asarray(profile, dtype=np.float32)
+    if len(p) < 3:
+        return np.zeros(0)
+
+    # >= dos dois lados: platôs também são candidatos
+    is_peak = (p[1:-1] >= p[:-2]) & (p[1:-1] >= p[2:]) & (p[1:-1] >= min_height)
+    candidates = np.flatnonzero(is_peak) + 1
+
+    # Do mais alto para o mais baixo; um pico ocupa o seu morro
+    order = candidates[np.argsort(-p[candidates], kind="stable")]
+    taken = np.zeros(len(p), dtype=bool)
+    kept = []
+
+    for i in order:
+        if taken[i]:
+            continue
+
+        half = p[i] / 2
+        lo, hi = i, i
+        while lo > 0 and p[lo - 1] >= half:
+            lo -= 1
+        while hi < len(p) - 1 and p[hi + 1] >= half:
+            hi += 1
+        taken[lo:hi + 1] = True
+
+        center = (lo + hi) / 2
+        if any(abs(center - c) < min_distance for c in kept):
+            continue
+        kept.append(center)
+        if max_peaks is not None and len(kept) >= max_peaks:
+            break
+
+    return np.sort(np.array(kept, dtype=float))
+
+
+def detect_frets_projection(fretboard_img, max_frets=24, min_distance=8, min_height=0.3, smooth=5):
+    cols, _ = gradient_profiles(fretboard_img, smooth)
+    xs = find_peaks(cols, min_distance, min_height, max_peaks=max_frets)
+    return [Fret(index=i, x=int(round(x))) for i, x in enumerate(xs)]
+
+
+def detect_strings_projection(img, max_strings=None, min_distance=6, min_height=0.3, smooth=3):
+    _, rows = gradient_profiles(img, smooth)
+    ys = find_peaks(rows, min_distance, min_height, max_peaks=max_strings)
+    return [String(index=i, y=int(round(y))) for i, y in enumerate(ys)]
+
+
+def _band_peaks(profiles, positions, offsets, min_contrast):
+    """
+    profiles (K, W): perfil de gradiente de cada faixa; devolve a
+    posição do pico das faixas cujo pico supera min_contrast × mediana.
+    """
+    best = profiles.argmax(axis=1)
+    peak = profiles[np.arange(len(profiles)), best]
+    contrast = peak / (np.median(profiles, axis=1) + 1e-6)
+
+    found = positions + offsets[best] + 0.5
+    return found[contrast >= min_contrast]
+
+
+def refine_lines_in_band(img, xs, ys, band_px=6, min_contrast=2.0):
+    """
+    Reencontra trastes/cordas só em faixas de ±band_px em torno das
+    posições previstas (sem varrer a imagem inteira).
+    Retorna (xs, ys) encontrados; linhas sem pico nítido ficam de fora.
+    """
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape
+    offsets = np.arange(-band_px, band_px + 1)
+
+    xs = np.round(np.asarray(xs, dtype=float)).astype(int)
+    ys = np.round(np.asarray(ys, dtype=float)).astype(int)
+
+    found_x = np.zeros(0)
+    if len(xs):
+        cols = np.clip(xs[:, None] + offsets[None, :], 0, w - 1)          # (K, W)
+        strips = gray[:, cols].astype(np.float32)                          # (h, K, W)
+        prof = np.abs(np.diff(strips, axis=2)).mean(axis=0)                # (K, W-1)
+        found_x = _band_peaks(prof, xs, offsets[:-1], min_contrast)
+
+    found_y = np.zeros(0)
+    if len(ys):
+        rows = np.clip(ys[:, None] + offsets[None, :], 0, h - 1)
+        strips = gray[rows, :].astype(np.float32)                          # (K, W, w)
+        prof = np.abs(np.diff(strips, axis=1)).mean(axis=2)
+        found_y = _band_peaks(prof, ys, offsets[:-1], min_contrast)
+
+    return found_x, found_y
+
+
+# ----------------------------
+# Comparação com o caminho Hough
+# ----------------------------
+def _match(found, reference, tolerance):
+    """
+    Pares (found, reference) a até `tolerance` px, um para um: cada item
+    casa no máximo uma vez, então duplicatas contam como falsos.
+    """
+    found = np.asarray(found, dtype=float)
+    reference = np.asarray(reference, dtype=float)
+    if len(found) == 0 or len(reference) == 0:
+        return 0
+
+    dist = np.abs(reference[:, None] - found[None, :])
+    pairs = 0
+    # Guloso pelo par mais próximo
+    while True:
+        i, j = np.unravel_index(np.argmin(dist), dist.shape)
+        if dist[i, j] > tolerance:
+            break
+        pairs += 1
+        dist[i, :] = np.inf
+        dist[:, j] = np.inf
+
+    return pairs
+
+
+def _score(found, reference, tolerance, kind, k):
+    """
+    Recall (referências encontradas), precisão (encontrados que casam
+    com uma referência) e contagens para o item k de cada (xs, ys).
+    """
+    n_found = sum(len(f[k]) for f in found)
+    n_ref = sum(len(r[k]) for r in reference)
+    pairs = sum(_match(f[k], r[k], tolerance) for f, r in zip(found, reference))
+
+    return {
+        f"{kind}_recall": pairs / max(n_ref, 1),
+        f"{kind}_precision": pairs / max(n_found, 1),
+        f"{kind}s_found": n_found,
+        f"{kind}s_true": n_ref,
+    }
+
+
+def synthetic_fretboard(w=800, h=140, n_frets=12, n_strings=6, noise=8.0, seed=0):
+    """
+    Escala retificada sintética com posições conhecidas
+    (trastes em temperamento igual, cordas equidistantes).
+    Retorna (img, xs, ys).
+    """
+    rng = np.random.default_rng(seed)
+
+    scale = w / (1 - 2 ** (-n_frets / 12)) * 0.95
+    xs = np.round(w * 0.02 + scale * (1 - 2 ** (-np.arange(n_frets + 1) / 12))).astype(int)
+    ys = np.round(np.linspace(h * 0.12, h * 0.88, n_strings)).astype(int)
+
+    img = np.full((h, w, 3), (40, 70, 110), dtype=np.uint8)
+    for x in xs:
+        cv2.line(img, (int(x), 0), (int(x), h - 1), (200, 200, 200), 3)
+    for y in ys:
+        cv2.line(img, (0, int(y)), (w - 1, int(y)), (170, 170, 170), 1)
+
+    img = np.clip(img + rng.normal(0, noise, img.shape), 0, 255).astype(np.uint8)
+    return img, xs, ys
+
+
+def compare_line_detectors(images, truths=None, tolerance=4):
+    """
+    Roda Hough (detect_frets/detect_strings) e projeção sobre as mesmas
+    imagens retificadas.
+
+    - truths: lista opcional de (xs, ys) verdadeiros; sem ela, a
+      projeção é comparada com o Hough (concordância)
+    Retorna, por método: ms/frame, trastes/cordas médios por frame e,
+    com truths, recall, precisão e contagem encontrados/verdadeiros de
+    trastes e cordas (precisão baixa = linhas falsas ou duplicadas).
+    """
+    from detect_frets import detect_frets
+    from detect_strings import detect_strings
+
+    methods = {
+        "hough": (detect_frets, detect_strings),
+        "projection": (detect_frets_projection, detect_strings_projection),
+    }
+
+    outputs = {}
+    report = {}
+
+    for name, (fret_fn, string_fn) in methods.items():
+        found = []
+        t0 = time.perf_counter()
+        for img in images:
+            found.append((
+                [f.x for f in fret_fn(img)],
+                [s.y for s in string_fn(img)]
+            ))
+        elapsed = time.perf_counter() - t0
+
+        outputs[name] = found
+        report[name] = {
+            "ms_per_frame": 1000 * elapsed / max(len(images), 1),
+            "frets_per_frame": float(np.mean([len(f) for f, _ in found])) if found else 0.0,
+            "strings_per_frame": float(np.mean([len(s) for _, s in found])) if found else 0.0,
+        }
+
+    if truths is not None:
+        for name, found in outputs.items():
+            report[name].update(_score(found, truths, tolerance, "fret", 0))
+            report[name].update(_score(found, truths, tolerance, "string", 1))
+    else:
+        # Sem verdade: o Hough faz o papel de referência
+        proj, ref = outputs["projection"], outputs["hough"]
+        for kind, k in (("fret", 0), ("string", 1)):
+            score = _score(proj, ref, tolerance, kind, k)
+            report["projection"][f"{kind}_agreement"] = score[f"{kind}_recall"]
+            report["projection"][f"{kind}_precision_vs_hough"] = score[f"{kind}_precision"]
+
+    for name, r in report.items():
+        print(f"📏 {name}: {r}")
+
+    return report
+
+
+def load_sample_fretboards(split="val", limit=50):
+    """
+    Recortes retificados do braço a partir das labels do dataset YOLO.
+    """
+    from detector_eval import DATASET_DIR, list_split, load_yolo_labels
+    from rectify_fretboard import rectify_fretboard
+
+    crops = []
+    for path, label in list_split(os.path.join(DATASET_DIR, split)):
+        if label is None:
+            continue
+        img = cv2.imread(path)
+        h, w = img.shape[:2]
+        for x1, y1, x2, y2 in load_yolo_labels(label, w, h).astype(int):
+            crop = img[max(y1, 0):y2, max(x1, 0):x2]
+            if crop.size:
+                crops.append(rectify_fretboard(crop))
+        if len(crops) >= limit:
+            break
+
+    return crops[:limit]
+
+
+if __name__ == "__main__":
+    from detector_eval import DATASET_DIR
+
+    synthetic = [synthetic_fretboard(seed=s) for s in range(50)]
+    compare_line_detectors(
+        [img for img, _, _ in synthetic],
+        truths=[(xs, ys) for _, xs, ys in synthetic]
+    )
+    if os.path.isdir(os.path.join(DATASET_DIR, "val")):
+        compare_line_detectors(load_sample_fretboards())
+    else:
+        print(f"ℹ️ Dataset não encontrado em {DATASET_DIR}; só a comparação sintética")
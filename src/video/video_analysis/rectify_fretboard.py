@@ -1,22 +1,30 @@
 import cv2
 import numpy as np
 
-def rectify_fretboard(fretboard_img):
-    gray = cv2.cvtColor(fretboard_img, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, 60, 140)
 
-    lines = cv2.HoughLines(edges, 1, np.pi / 180, 160)
+def estimate_rectification(fretboard_img, features=None, max_tilt=np.pi / 6):
+    """
+    Estima a rotação que alinha a escala e a retorna como matriz 3×3
+    (rotação em torno do centro), sem reamostrar a imagem.
+
+    features: FrameFeatures da mesma imagem; reaproveita o cinza e as
+    bordas já calculados (mesmos limiares de Canny + HoughLines).
+    """
+    if features is not None:
+        thetas = features.rectification_angles()
+    else:
+        gray = cv2.cvtColor(fretboard_img, cv2.COLOR_BGR2GRAY)
+        edges = cv2.Canny(gray, 60, 140)
+
+        lines = cv2.HoughLines(edges, 1, np.pi / 180, 160)
+        thetas = np.zeros(0) if lines is None else lines[:, 0, 1]
 
     angle = 0.0
-    if lines is not None:
-        valid_angles = []
-        for rho, theta in lines[:, 0]:
-            # linhas quase verticais
-            if abs(theta - np.pi / 2) < np.pi / 6:
-                valid_angles.append(theta)
+    # linhas quase verticais
+    valid_angles = thetas[np.abs(thetas - np.pi / 2) < max_tilt]
 
-        if valid_angles:
-            angle = np.mean(valid_angles) - np.pi / 2
+    if len(valid_angles):
+        angle = np.mean(valid_angles) - np.pi / 2
 
     h, w = fretboard_img.shape[:2]
     center = (w // 2, h // 2)
@@ -25,9 +33,15 @@ def rectify_fretboard(fretboard_img):
         center, angle * 180 / np.pi, 1.0
     )
 
+    return np.vstack([rot_matrix, [0.0, 0.0, 1.0]])
+
+
+def rectify_fretboard(fretboard_img):
+    h, w = fretboard_img.shape[:2]
+
     rotated = cv2.warpAffine(
         fretboard_img,
-        rot_matrix,
+        estimate_rectification(fretboard_img)[:2],
         (w, h),
         flags=cv2.INTER_LINEAR,
         borderMode=cv2.BORDER_REPLICATE
@@ -36,9 +50,14 @@ def rectify_fretboard(fretboard_img):
     return rotated
 
 
-def refine_homography(frame, frets, strings):
+def refine_homography_matrix(frets, strings):
+    """
+    Homografia que leva o retângulo (primeiro/último traste ×
+    primeira/última corda) para (0, 0)–(w, h).
+    Retorna (H, (w, h)) ou (None, None) se o grid for insuficiente.
+    """
     if len(frets) < 2 or len(strings) < 2:
-        return frame
+        return None, None
 
     frets = sorted(frets)
     strings = sorted(strings)
@@ -54,7 +73,7 @@ def refine_homography(frame, frets, strings):
     h = strings[-1] - strings[0]
 
     if w < 50 or h < 20:
-        return frame
+        return None, None
 
     dst = np.float32([
         [0, 0],
@@ -64,4 +83,51 @@ def refine_homography(frame, frets, strings):
     ])
 
     H = cv2.getPerspectiveTransform(src, dst)
-    return cv2.warpPerspective(frame, H, (int(w), int(h)))
+    return H, (int(w), int(h))
+
+
+def refine_homography(frame, frets, strings):
+    H, size = refine_homography_matrix(frets, strings)
+    if H is None:
+        return frame
+
+    return cv2.warpPerspective(frame, H, size)
+
+
+def compose_transforms(*matrices):
+    """
+    Compõe transformações 3×3 na ordem de aplicação:
+    compose_transforms(A, B, C) = C · B · A (A é aplicada primeiro).
+    Matrizes None são ignoradas (identidade).
+    """
+    H = np.eye(3)
+    for M in matrices:
+        if M is not None:
+            H = np.asarray(M, dtype=float) @ H
+    return H
+
+
+def map_grid(H, frets, strings):
+    """
+    Leva as coordenadas dos trastes (x) e cordas (y) por uma homografia.
+    Para as homografias de refinamento (retângulo → retângulo) o
+    mapeamento é separável; cada eixo é transformado no ponto médio do outro.
+    """
+    frets = np.asarray(frets, dtype=np.float32)
+    strings = np.asarray(strings, dtype=np.float32)
+
+    if H is None:
+        return frets, strings
+
+    y_mid = float(np.mean(strings)) if len(strings) else 0.0
+    x_mid = float(np.mean(frets)) if len(frets) else 0.0
+
+    fx = cv2.perspectiveTransform(
+        np.stack([frets, np.full_like(frets, y_mid)], axis=1).reshape(-1, 1, 2), H
+    ).reshape(-1, 2)[:, 0] if len(frets) else frets
+
+    sy = cv2.perspectiveTransform(
+        np.stack([np.full_like(strings, x_mid), strings], axis=1).reshape(-1, 1, 2), H
+    ).reshape(-1, 2)[:, 1] if len(strings) else strings
+
+    return fx, sy
@@ -0,0 +1,204 @@
+from collections import deque
+
+import cv2
+import numpy as np
+
+from detect_fretboard import detect_fretboard_bbox, submit_fretboard_bbox
+
+
+class FretboardROITracker:
+    """
+    Detecta o braço a cada `detect_every` frames e, entre detecções,
+    propaga a bbox com optical flow (Lucas-Kanade) sobre cantos da ROI.
+
+    Re-detecção automática quando:
+      - o intervalo de detecção é atingido
+      - a confiança (detector × média móvel da razão de inliers) cai
+        abaixo de min_confidence
+      - sobram poucos pontos rastreados ou o erro forward-backward cresce (drift)
+
+    Com prefetch(), as detecções periódicas são disparadas antes de o
+    frame ser processado (backend "pipelined"); só as re-detecções por
+    perda de rastreamento ficam síncronas.
+    """
+
+    def __init__(
+        self,
+        detect_fn=detect_fretboard_bbox,
+        submit_fn=submit_fretboard_bbox,
+        detect_every=15,
+        min_confidence=0.4,
+        min_points=12,
+        max_fb_error=1.5,
+        min_inlier_ratio=0.6,
+        inlier_smoothing=0.5
+    ):
+        self.detect_fn = detect_fn
+        self.submit_fn = submit_fn
+        self.detect_every = detect_every
+        self.min_confidence = min_confidence
+        self.min_points = min_points
+        self.max_fb_error = max_fb_error
+        self.min_inlier_ratio = min_inlier_ratio
+        self.inlier_smoothing = inlier_smoothing
+
+        self.bbox = None
+        self.confidence = 0.0
+        self.detection_confidence = 0.0
+        self.inlier_ema = 1.0
+        self.prev_gray = None
+        self.prev_points = None
+        self.frames_since_detection = 0
+
+        # Estatísticas
+        self.frames = 0
+        self.detector_calls = 0
+
+    def _init_points(self, gray, bbox):
+        x1, y1, x2, y2 = bbox
+        mask = np.zeros_like(gray)
+        mask[y1:y2, x1:x2] = 255
+
+        self.prev_points = cv2.goodFeaturesToTrack(
+            gray,
+            maxCorners=100,
+            qualityLevel=0.01,
+            minDistance=8,
+            mask=mask
+        )
+
+    def _detect(self, frame, gray, frame_id=None, pending=None):
+        self.detector_calls += 1
+        detection = pending() if pending is not None else self.detect_fn(frame, frame_id)
+
+        if detection is None:
+            self.bbox = None
+            self.confidence = self.detection_confidence = 0.0
+            self.prev_points = None
+            return None
+
+        self.bbox = tuple(int(v) for v in detection.bbox)
+        self.confidence = self.detection_confidence = detection.confidence
+        self.inlier_ema = 1.0
+        self.frames_since_detection = 0
+        self._init_points(gray, self.bbox)
+        return self.bbox
+
+    def _track(self, gray):
+        if self.prev_points is None or len(self.prev_points) < self.min_points:
+            return None
+
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            self.prev_gray, gray, self.prev_points, None
+        )
+        back_points, status_back, _ = cv2.calcOpticalFlowPyrLK(
+            gray, self.prev_gray, new_points, None
+        )
+
+        # Checagem forward-backward: pontos que "voltam" para outro lugar derivaram
+        fb_error = np.linalg.norm(
+            (self.prev_points - back_points).reshape(-1, 2), axis=1
+        )
+        good = (
+            (status.ravel() == 1) &
+            (status_back.ravel() == 1) &
+            (fb_error < self.max_fb_error)
+        )
+
+        if good.sum() < self.min_points:
+            return None
+
+        src = self.prev_points[good].reshape(-1, 2)
+        dst = new_points[good].reshape(-1, 2)
+
+        M, inliers = cv2.estimateAffinePartial2D(
+            src, dst, method=cv2.RANSAC, ransacReprojThreshold=3.0
+        )
+        if M is None:
+            return None
+
+        inlier_ratio = float(inliers.mean())
+        if inlier_ratio < self.min_inlier_ratio:
+            return None
+
+        # Propaga os cantos da bbox
+        x1, y1, x2, y2 = self.bbox
+        corners = np.float32([[x1, y1], [x2, y1], [x2, y2], [x1, y2]])
+        moved = corners @ M[:, :2].T + M[:, 2]
+
+        h, w = gray.shape[:2]
+        nx1, ny1 = np.clip(moved.min(axis=0), 0, [w, h]).astype(int)
+        nx2, ny2 = np.clip(moved.max(axis=0), 0, [w, h]).astype(int)
+
+        if nx2 - nx1 < 10 or ny2 - ny1 < 10:
+            return None
+
+        # Média móvel limitada a [min_inlier_ratio, 1]: reflete a qualidade
+        # recente do rastreamento sem decair a cada frame rastreado
+        a = self.inlier_smoothing
+        self.inlier_ema = a * self.inlier_ema + (1 - a) * inlier_ratio
+        self.confidence = self.detection_confidence * self.inlier_ema
+        self.prev_points = dst[inliers.ravel() == 1].reshape(-1, 1, 2)
+        return nx1, ny1, nx2, ny2
+
+    def prefetch(self, frames, lookahead=None):
+        """
+        Consome (frame_index, timestamp, frame) e gera
+        (frame_index, timestamp, frame, pending), com a detecção periódica
+        (um frame a cada detect_every) já disparada até `lookahead` frames
+        à frente (padrão: detect_every). pending vai para update().
+        """
+        lookahead = self.detect_every if lookahead is None else lookahead
+        buffered = deque()
+
+        for i, (frame_id, timestamp, frame) in enumerate(frames):
+            pending = self.submit_fn(frame, frame_id) if i % self.detect_every == 0 else None
+            buffered.append((frame_id, timestamp, frame, pending))
+            if len(buffered) > lookahead:
+                yield buffered.popleft()
+
+        while buffered:
+            yield buffered.popleft()
+
+    def update(self, frame, frame_id=None, pending=None):
+        """
+        Retorna (roi, bbox), no mesmo formato de detect_fretboard.
+        pending: detecção antecipada de prefetch(); quando presente,
+        substitui o rastreamento neste frame.
+        """
+        self.frames += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        bbox = None
+        need_detection = (
+            pending is not None or
+            self.bbox is None or
+            self.frames_since_detection >= self.detect_every or
+            self.confidence < self.min_confidence
+        )
+
+        if not need_detection:
+            bbox = self._track(gray)
+            if bbox is not None:
+                self.bbox = bbox
+                self.frames_since_detection += 1
+                # Renova os pontos se o rastreamento estiver rareando
+                if len(self.prev_points) < 2 * self.min_points:
+                    self._init_points(gray, bbox)
+
+        if bbox is None:
+            bbox = self._detect(frame, gray, frame_id, pending)
+
+        self.prev_gray = gray
+
+        if bbox is None:
+            return None, None
+
+        x1, y1, x2, y2 = bbox
+        return frame[y1:y2, x1:x2], bbox
+
+    def detector_rate(self):
+        """
+        Fração de frames que chamaram o detector.
+        """
+        return self.detector_calls / max(self.frames, 1)
@@ -0,0 +1,93 @@
+"""
+Servidor HTTP stub que imita a API serverless da Roboflow,
+com latência configurável. Permite medir a vazão do
+PipelinedDetector em função da profundidade em voo, sem rede.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from fretboard_detectors import RemoteHTTPDetector
+from detector_pipeline import PipelinedDetector
+
+
+STUB_PREDICTION = {
+    "x": 320.0, "y": 240.0, "width": 400.0, "height": 120.0,
+    "confidence": 0.9, "class": "fretboard"
+}
+
+
+def serve_stub(port=0, latency_s=0.1, fail_every=0):
+    """
+    Sobe o stub em uma thread. fail_every > 0 responde 503 a cada
+    N requisições (para exercitar o retry).
+    Retorna (server, api_url); encerre com server.shutdown().
+    """
+    counter = {"n": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency_s)
+
+            with lock:
+                counter["n"] += 1
+                fail = fail_every > 0 and counter["n"] % fail_every == 0
+
+            if fail:
+                self.send_response(503)
+                self.end_headers()
+                return
+
+            body = json.dumps({"predictions": [STUB_PREDICTION]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def benchmark_in_flight(depths=(1, 2, 4, 8, 16), n_frames=64, latency_s=0.1):
+    """
+    Vazão (frames/s) do PipelinedDetector contra o stub, por profundidade.
+    """
+    server, api_url = serve_stub(latency_s=latency_s)
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    results = {}
+    try:
+        for depth in depths:
+            detector = PipelinedDetector(
+                RemoteHTTPDetector(model_id="stub/1", api_url=api_url, api_key="stub"),
+                max_in_flight=depth
+            )
+
+            t0 = time.perf_counter()
+            for _ in detector.detect_stream((i, None, frame) for i in range(n_frames)):
+                pass
+            elapsed = time.perf_counter() - t0
+            detector.close()
+
+            results[depth] = n_frames / elapsed
+            print(f"📡 {depth:>2} em voo: {results[depth]:.1f} frames/s")
+    finally:
+        server.shutdown()
+
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_in_flight()
@@ -0,0 +1,130 @@
+"""
+Arquivo: preprocess_cache.py
+Função: Cache incremental (endereçado por conteúdo) dos frames pré-processados.
+Chave:
+  - sha1(bytes do frame de entrada + parâmetros do pré-processamento)
+Entradas/Saídas:
+  - data/cache/preprocess/<ab>/<chave>.npz  (base + structural)
+Evicção:
+  - LRU por mtime (atualizado a cada acerto) sob um orçamento de disco,
+    verificada a cada gravação (não só no fim da execução)
+  - entradas em np.savez_compressed: base/estrutural têm grandes áreas
+    uniformes e comprimem bem; o custo é CPU de zlib em put/get, pequeno
+    perto do pré-processamento que o acerto evita
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+
+
+CACHE_DIR = "data/cache/preprocess"
+MAX_CACHE_BYTES = 5 * 1024 ** 3
+
+
+def cache_key(data: bytes, params: dict) -> str:
+    h = hashlib.sha1()
+    h.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    h.update(data)
+    return h.hexdigest()
+
+
+def array_key(img: np.ndarray, params: dict) -> str:
+    h = hashlib.sha1()
+    h.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    h.update(str((img.shape, img.dtype.str)).encode("utf-8"))
+    h.update(np.ascontiguousarray(img).data)
+    return h.hexdigest()
+
+
+class PreprocessCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+
+        # Tamanho do cache na última varredura + o gravado por este
+        # processo desde então. Outros workers também gravam: a varredura
+        # é refeita a cada rescan_fraction × max_bytes gravados aqui,
+        # o que limita o excesso a ~workers × rescan_fraction
+        self.rescan_fraction = 0.05
+        self._size = None
+        self._written = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npz")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                base, structural = data["base"], data["structural"]
+            # LRU: acerto renova o mtime
+            os.utime(path, None)
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return base, structural
+
+    def put(self, key, base, structural):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Gravação atômica: outros workers podem ler a mesma chave
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, base=base, structural=structural)
+        size = os.path.getsize(tmp)
+        os.replace(tmp, path)
+
+        self._written += size
+        if self._size is None or self._written > self.rescan_fraction * self.max_bytes:
+            self._size, self._written = self.size_bytes(), 0
+
+        if self._size + self._written > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".npz"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, target=0.9):
+        """
+        Remove as entradas menos recentes até caber em target × max_bytes
+        (abaixo do limite, para não varrer o cache a cada gravação).
+        Retorna o número de entradas removidas.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        budget = self.max_bytes * target if total > self.max_bytes else self.max_bytes
+
+        removed = 0
+        for _, size, path in entries:
+            if total <= budget:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+
+        self._size, self._written = total, 0
+        return removed
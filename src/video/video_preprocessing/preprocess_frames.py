@@ -7,77 +7,350 @@ Objetivo:
   - manter linhas longas (trastes e cordas)
 Entradas:
   - data/raw/frames/*.jpg
+  - ou um iterador de (frame_index, timestamp, frame) (ex.: frame_source.iter_video_frames)
 Saídas:
   - data/processed/frames/base/*.jpg
   - data/processed/frames/structural/*.jpg
+  - ou um iterador de (frame_index, timestamp, base, structural), sem disco
+  - ou frame stores em chunks (frame_store.FrameStoreWriter)
+Cache:
+  - com use_cache=True, frames cujo conteúdo e parâmetros não mudaram
+    são lidos de preprocess_cache em vez de recalculados
 """
 
 import os
+import json
+import time
+from multiprocessing import Pool
+
 import cv2
 import numpy as np
 from tqdm import tqdm
 
+from preprocess_cache import PreprocessCache, cache_key, array_key, CACHE_DIR, MAX_CACHE_BYTES
+
 
 RAW_DIR = "data/raw/frames"
 OUT_BASE = "data/processed/frames/base"
 OUT_STRUCT = "data/processed/frames/structural"
 
+# Chave de (frame → JPEGs gravados), para pular regravações em cache hits
+OUT_MANIFEST = "data/processed/frames/cache_manifest.json"
 
-def preprocess_frames(frames_dir: str = RAW_DIR):
-    os.makedirs(OUT_BASE, exist_ok=True)
-    os.makedirs(OUT_STRUCT, exist_ok=True)
+# Parâmetros do pré-processamento (fazem parte da chave do cache)
+PREPROCESS_PARAMS = {
+    "blur_ksize": 5,
+    "clahe_clip": 2.0,
+    "clahe_tile": 8,
+    "sobel_ksize": 3,
+    "sobel_weights": [0.5, 0.5],
+}
 
-    frame_files = sorted(f for f in os.listdir(frames_dir) if f.endswith(".jpg"))
-    print(f"🖼️ Pré-processando {len(frame_files)} frames para o Passo 2...")
 
-    for file in tqdm(frame_files):
-        path = os.path.join(frames_dir, file)
-        img = cv2.imread(path)
+def create_clahe(params=PREPROCESS_PARAMS):
+    return cv2.createCLAHE(
+        clipLimit=params["clahe_clip"],
+        tileGridSize=(params["clahe_tile"], params["clahe_tile"])
+    )
 
-        # -------------------------------------------------
-        # 1. Conversão para escala de cinza
-        # -------------------------------------------------
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-        # -------------------------------------------------
-        # 2. Redução suave de ruído (preserva estruturas)
-        # -------------------------------------------------
-        denoised = cv2.GaussianBlur(gray, (5, 5), 0)
+def preprocess_frame(img, clahe=None, params=PREPROCESS_PARAMS):
+    """
+    Pré-processa um único frame BGR.
+    Retorna:
+      - base_frame (CLAHE)
+      - structural (gradientes Sobel)
+    """
+    if clahe is None:
+        clahe = create_clahe(params)
 
-        # -------------------------------------------------
-        # 3. Contraste local controlado (CLAHE)
-        # -------------------------------------------------
-        clahe = cv2.createCLAHE(
-            clipLimit=2.0,
-            tileGridSize=(8, 8)
-        )
-        contrast = clahe.apply(denoised)
+    # -------------------------------------------------
+    # 1. Conversão para escala de cinza
+    # -------------------------------------------------
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-        # -------------------------------------------------
-        # FRAME BASE (para CNN / detecção do braço)
-        # -------------------------------------------------
-        base_frame = contrast
+    # -------------------------------------------------
+    # 2. Redução suave de ruído (preserva estruturas)
+    # -------------------------------------------------
+    k = params["blur_ksize"]
+    denoised = cv2.GaussianBlur(gray, (k, k), 0)
 
-        # -------------------------------------------------
-        # FRAME ESTRUTURAL (para trastes e cordas)
-        # -------------------------------------------------
-        # Realça linhas longas sem fragmentar
-        grad_x = cv2.Sobel(contrast, cv2.CV_64F, 1, 0, ksize=3)
-        grad_y = cv2.Sobel(contrast, cv2.CV_64F, 0, 1, ksize=3)
+    # -------------------------------------------------
+    # 3. Contraste local controlado (CLAHE)
+    # -------------------------------------------------
+    contrast = clahe.apply(denoised)
+
+    # -------------------------------------------------
+    # FRAME BASE (para CNN / detecção do braço)
+    # -------------------------------------------------
+    base_frame = contrast
+
+    # -------------------------------------------------
+    # FRAME ESTRUTURAL (para trastes e cordas)
+    # -------------------------------------------------
+    # Realça linhas longas sem fragmentar
+    ksize = params["sobel_ksize"]
+    wx, wy = params["sobel_weights"]
+    grad_x = cv2.Sobel(contrast, cv2.CV_64F, 1, 0, ksize=ksize)
+    grad_y = cv2.Sobel(contrast, cv2.CV_64F, 0, 1, ksize=ksize)
+
+    structural = cv2.convertScaleAbs(
+        cv2.addWeighted(grad_x, wx, grad_y, wy, 0)
+    )
+
+    return base_frame, structural
+
+
+def iter_preprocessed_frames(frames):
+    """
+    Consome um iterador de (frame_index, timestamp, frame) e gera
+    (frame_index, timestamp, base, structural) sem tocar o disco.
+    """
+    clahe = create_clahe()
+
+    for index, timestamp, img in frames:
+        base_frame, structural = preprocess_frame(img, clahe)
+        yield index, timestamp, base_frame, structural
+
+
+# -------------------------------------------------
+# Processamento de um item (serial ou dentro do worker)
+# -------------------------------------------------
+def _preprocess_item(item, clahe, keep_frames, cache=None, params=PREPROCESS_PARAMS):
+    """
+    item = (frame_index, timestamp, src, name, written_key)
+      - src: caminho do JPEG ou ndarray BGR
+      - name: nome do arquivo de saída ou None (não grava)
+      - written_key: chave de cache dos JPEGs já gravados em `name` (ou None)
+
+    Retorna (frame_index, timestamp, base, structural, key).
+    """
+    index, timestamp, src, name, written_key = item
+    key = None
+    cached = None
+
+    if cache is not None:
+        if isinstance(src, str):
+            # Hash dos bytes do arquivo: um acerto evita até a decodificação
+            data = np.fromfile(src, dtype=np.uint8)
+            key = cache_key(data.tobytes(), params)
+        else:
+            key = array_key(src, params)
+        cached = cache.get(key)
+
+    if cached is not None:
+        base_frame, structural = cached
+        if name is not None and key == written_key:
+            name = None  # JPEGs já estão atualizados
+    else:
+        if isinstance(src, str):
+            img = cv2.imdecode(data, cv2.IMREAD_COLOR) if cache is not None else cv2.imread(src)
+        else:
+            img = src
+
+        base_frame, structural = preprocess_frame(img, clahe, params)
+
+        if cache is not None:
+            cache.put(key, base_frame, structural)
+
+    if name is not None:
+        cv2.imwrite(os.path.join(OUT_BASE, name), base_frame)
+        cv2.imwrite(os.path.join(OUT_STRUCT, name), structural)
+
+    if not keep_frames:
+        return index, timestamp, None, None, key
 
-        structural = cv2.convertScaleAbs(
-            cv2.addWeighted(grad_x, 0.5, grad_y, 0.5, 0)
+    return index, timestamp, base_frame, structural, key
+
+
+# -------------------------------------------------
+# Modo paralelo (um CLAHE por worker)
+# -------------------------------------------------
+_worker_clahe = None
+_worker_cache = None
+_worker_params = PREPROCESS_PARAMS
+
+
+def _init_worker(params=PREPROCESS_PARAMS, cache_dir=None, max_cache_bytes=MAX_CACHE_BYTES):
+    global _worker_clahe, _worker_cache, _worker_params
+    # Evita oversubscription: o paralelismo é entre frames
+    cv2.setNumThreads(1)
+    _worker_params = params
+    _worker_clahe = create_clahe(params)
+    _worker_cache = (
+        PreprocessCache(cache_dir, max_cache_bytes) if cache_dir is not None else None
+    )
+
+
+def _preprocess_batch(task):
+    batch, keep_frames = task
+    return [
+        _preprocess_item(item, _worker_clahe, keep_frames, _worker_cache, _worker_params)
+        for item in batch
+    ]
+
+
+def _batched(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_preprocessed_frames_parallel(
+    items,
+    workers=None,
+    batch_size=32,
+    keep_frames=True,
+    params=PREPROCESS_PARAMS,
+    cache_dir=None,
+    max_cache_bytes=MAX_CACHE_BYTES
+):
+    """
+    Distribui lotes de itens (ver _preprocess_item) entre `workers` processos.
+    Leitura/gravação dos JPEGs (e do cache) acontece dentro dos workers.
+    A saída preserva a ordem de entrada.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = ((batch, keep_frames) for batch in _batched(items, batch_size))
+
+    with Pool(workers, initializer=_init_worker, initargs=(params, cache_dir, max_cache_bytes)) as pool:
+        for results in pool.imap(_preprocess_batch, tasks):
+            yield from results
+
+
+def preprocess_frames(
+    frames_dir: str = RAW_DIR,
+    frames=None,
+    save: bool = True,
+    base_store=None,
+    struct_store=None,
+    workers: int = 1,
+    batch_size: int = 32,
+    params=PREPROCESS_PARAMS,
+    use_cache: bool = False,
+    cache_dir: str = CACHE_DIR,
+    max_cache_bytes: int = MAX_CACHE_BYTES
+):
+    """
+    - frames=None: lê os JPEGs de frames_dir (fluxo original)
+    - frames=iterador de (frame_index, timestamp, frame): streaming direto do vídeo
+      (ou um frame_store.FrameStore)
+    - save=False: não grava JPEGs
+    - base_store/struct_store: writers com append(frame_index, timestamp, frame)
+      (ex.: frame_store.FrameStoreWriter); o fechamento fica com o chamador
+    - workers > 1: processa lotes de batch_size frames em paralelo
+    - use_cache=True: reaproveita frames já processados com os mesmos
+      parâmetros; entradas antigas são removidas acima de max_cache_bytes
+    """
+    if save:
+        os.makedirs(OUT_BASE, exist_ok=True)
+        os.makedirs(OUT_STRUCT, exist_ok=True)
+
+    cache = PreprocessCache(cache_dir, max_cache_bytes) if use_cache else None
+
+    manifest = {}
+    if cache is not None and save and os.path.exists(OUT_MANIFEST):
+        with open(OUT_MANIFEST, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    if frames is None:
+        frame_files = sorted(f for f in os.listdir(frames_dir) if f.endswith(".jpg"))
+        print(f"🖼️ Pré-processando {len(frame_files)} frames para o Passo 2...")
+        items = (
+            (i, None, os.path.join(frames_dir, f), f if save else None, manifest.get(f))
+            for i, f in enumerate(frame_files)
+        )
+    else:
+        print("🖼️ Pré-processando frames em streaming para o Passo 2...")
+        frame_files = None
+        items = (
+            (i, ts, img, f"frame_{i:05d}.jpg" if save else None, manifest.get(f"frame_{i:05d}.jpg"))
+            for i, ts, img in frames
         )
 
+    keep_frames = base_store is not None or struct_store is not None
+
+    if workers > 1:
+        print(f"⚡ Modo paralelo: {workers} workers, lotes de {batch_size}")
+        results = iter_preprocessed_frames_parallel(
+            items,
+            workers=workers,
+            batch_size=batch_size,
+            keep_frames=keep_frames,
+            params=params,
+            cache_dir=cache_dir if use_cache else None,
+            max_cache_bytes=max_cache_bytes
+        )
+    else:
+        clahe = create_clahe(params)
+        results = (
+            _preprocess_item(item, clahe, keep_frames, cache, params)
+            for item in items
+        )
+
+    count = 0
+    for index, timestamp, base_frame, structural, key in tqdm(results):
         # -------------------------------------------------
-        # Salvamento
+        # Salvamento (JPEGs já gravados em _preprocess_item)
         # -------------------------------------------------
-        cv2.imwrite(os.path.join(OUT_BASE, file), base_frame)
-        cv2.imwrite(os.path.join(OUT_STRUCT, file), structural)
+        if base_store is not None:
+            base_store.append(index, timestamp, base_frame)
+        if struct_store is not None:
+            struct_store.append(index, timestamp, structural)
+        if key is not None and save:
+            manifest[frame_files[index] if frame_files else f"frame_{index:05d}.jpg"] = key
+        count += 1
+
+    if cache is not None:
+        if save:
+            with open(OUT_MANIFEST, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+
+        removed = cache.evict()
+        if workers <= 1:
+            print(f"🗃️ Cache: {cache.hits} acertos, {cache.misses} recalculados")
+        print(f"🗃️ Cache: {removed} entradas antigas removidas")
+
+    print(f"✅ {count} frames preparados para o Passo 2")
+    if save:
+        print(f" - Base geométrica: {OUT_BASE}")
+        print(f" - Estrutural (linhas): {OUT_STRUCT}")
+
+
+def benchmark_workers(frames_dir: str = RAW_DIR, worker_counts=(1, 2, 4, 8), limit: int = 500):
+    """
+    Curva de speedup por número de workers (sem gravação em disco).
+    Retorna {workers: frames/s}.
+    """
+    frame_files = sorted(f for f in os.listdir(frames_dir) if f.endswith(".jpg"))[:limit]
+    items = [
+        (i, None, os.path.join(frames_dir, f), None, None)
+        for i, f in enumerate(frame_files)
+    ]
+
+    results = {}
+    for workers in worker_counts:
+        t0 = time.perf_counter()
+        if workers > 1:
+            for _ in iter_preprocessed_frames_parallel(items, workers=workers, keep_frames=False):
+                pass
+        else:
+            clahe = create_clahe()
+            for item in items:
+                _preprocess_item(item, clahe, keep_frames=False)
+
+        results[workers] = len(items) / max(time.perf_counter() - t0, 1e-9)
+        print(
+            f"⚡ {workers} workers: {results[workers]:.1f} frames/s "
+            f"({results[workers] / max(results[worker_counts[0]], 1e-9):.2f}x)"
+        )
 
-    print("✅ Frames preparados para o Passo 2")
-    print(f" - Base geométrica: {OUT_BASE}")
-    print(f" - Estrutural (linhas): {OUT_STRUCT}")
+    return results
 
 
 if __name__ == "__main__":
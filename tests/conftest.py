@@ -0,0 +1,29 @@
+import pytest
+
+
+N_FRAMES = 60
+LEVEL_STEP = 4
+
+
+@pytest.fixture
+def indexed_video(tmp_path):
+    """
+    Vídeo em que o frame i é cinza uniforme de nível i * LEVEL_STEP,
+    para conferir qual frame foi realmente lido.
+    """
+    np = pytest.importorskip("numpy")
+    cv2 = pytest.importorskip("cv2")
+
+    path = str(tmp_path / "indexed.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("VideoWriter MJPG indisponível")
+
+    for i in range(N_FRAMES):
+        writer.write(np.full((48, 64, 3), i * LEVEL_STEP, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def frame_number(frame):
+    return int(round(frame.mean() / LEVEL_STEP))
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from frame_source import iter_video_frames, iter_video_frames_at  # noqa: E402
+from conftest import frame_number  # noqa: E402
+
+
+def test_iter_video_frames_at_short_gaps_read_requested_frames(indexed_video):
+    # Todas as lacunas menores que seek_gap: caminho de grab() sequencial
+    indices = [10, 15, 16, 30]
+    got = list(iter_video_frames_at(indexed_video, indices, seek_gap=60))
+
+    assert [index for index, _, _ in got] == indices
+    assert [frame_number(frame) for _, _, frame in got] == indices
+
+
+def test_iter_video_frames_at_mixed_gaps(indexed_video):
+    indices = [2, 5, 40, 41]
+    got = list(iter_video_frames_at(indexed_video, indices, seek_gap=10))
+
+    assert [frame_number(frame) for _, _, frame in got] == indices
+
+
+def test_iter_video_frames_start_is_exact(indexed_video):
+    got = list(iter_video_frames(indexed_video, start=25, end=28))
+
+    assert [index for index, _, _ in got] == [25, 26, 27]
+    assert [frame_number(frame) for _, _, frame in got] == [25, 26, 27]
+
+
+@pytest.mark.parametrize("step", [0, -1])
+def test_iter_video_frames_rejects_invalid_step(indexed_video, step):
+    with pytest.raises(ValueError):
+        next(iter_video_frames(indexed_video, step=step))
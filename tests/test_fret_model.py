@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "video", "video_analysis"))
+
+from fret_model import FretGridModel, solve_fret_grid  # noqa: E402
+
+WIDTH = 800
+TRUE = FretGridModel(nut_x=16.0, scale_length=1520.0, direction=1, inliers=0, residual=0.0)
+FRETS = TRUE.positions(12)
+
+
+def _mid(a, b):
+    # Espúria no meio do espaço entre dois trastes (pior caso: só um
+    # grid mais denso a explicaria)
+    return (FRETS[a] + FRETS[b]) / 2
+
+
+def _assert_true_grid(model):
+    assert model is not None
+    assert model.direction == 1
+    assert abs(model.scale_length - TRUE.scale_length) < 0.02 * TRUE.scale_length
+    assert np.abs(model.positions(12) - FRETS).max() <= 4
+
+
+@pytest.mark.parametrize("frets, spurious", [
+    ([2, 5, 8, 11], [_mid(6, 7)]),
+    ([0, 3, 6, 9, 12], [_mid(1, 2), _mid(7, 8), _mid(10, 11)]),
+    ([1, 2, 4, 7, 9, 12], [_mid(0, 1), _mid(5, 6), _mid(10, 11)]),
+])
+def test_sparse_lines_with_outliers(frets, spurious):
+    xs = np.concatenate([FRETS[frets], spurious])
+
+    _assert_true_grid(solve_fret_grid(xs, WIDTH))
+
+
+def test_many_candidates():
+    rng = np.random.default_rng(0)
+    # Cada traste visto como vários segmentos, mais linhas espúrias
+    segments = rng.choice(FRETS, 90) + rng.normal(0, 1.5, 90)
+    xs = np.concatenate([FRETS, segments, rng.uniform(0, WIDTH, 57)])
+    assert len(xs) == 160
+
+    t0 = time.perf_counter()
+    model = solve_fret_grid(xs, WIDTH)
+    elapsed = time.perf_counter() - t0
+
+    _assert_true_grid(model)
+    assert elapsed < 1.0
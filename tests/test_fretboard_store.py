@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "video", "video_analysis"))
+
+from fretboard_store import FretboardStateStore  # noqa: E402
+
+
+@pytest.mark.parametrize("on_disk", [False, True])
+def test_record_past_estimated_frame_count_grows_store(tmp_path, on_disk):
+    store_dir = str(tmp_path / "store") if on_disk else None
+    store = FretboardStateStore(n_frames=4, fps=10.0, store_dir=store_dir)
+    store.record(1, bbox=(1, 2, 3, 4))
+    store.record(9, bbox=(5, 6, 7, 8))
+
+    assert len(store) >= 10
+    assert store.valid[[1, 9]].all() and not store.valid[[0, 2, 8]].any()
+    assert store.bbox[1].tolist() == [1, 2, 3, 4]
+    assert store.bbox[9].tolist() == [5, 6, 7, 8]
+
+    if on_disk:
+        store.flush()
+        reopened = FretboardStateStore.open(store_dir)
+        assert len(reopened) == len(store)
+        assert reopened.bbox[9].tolist() == [5, 6, 7, 8]
+
+
+def test_for_video_over_allocates_from_container_metadata():
+    store = FretboardStateStore.for_video(frame_count=1000, fps=30.0)
+
+    assert len(store) >= 1000 + 30
+    assert store.fps == 30.0
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from parallel_decode import iter_video_frames_parallel, plan_segments  # noqa: E402
+from conftest import N_FRAMES, frame_number  # noqa: E402
+
+
+def test_plan_segments_last_segment_is_open():
+    assert plan_segments(100, 10.0, segment_sec=3.0) == [(0, 30), (30, 60), (60, 90), (90, None)]
+    assert plan_segments(0, 30.0) == [(0, None)]
+
+
+def test_plan_segments_starts_on_keyframes():
+    # Cortes nominais em 30/60/90 → primeiro keyframe a partir de cada um
+    segments = plan_segments(100, 10.0, segment_sec=3.0, keyframes=[0, 25, 50, 75])
+    assert segments == [(0, 50), (50, 75), (75, None)]
+
+
+def test_parallel_decode_in_order(indexed_video):
+    got = list(iter_video_frames_parallel(
+        indexed_video, workers=3, segment_sec=0.25, chunk_frames=2, report=False
+    ))
+
+    assert [index for index, _, _ in got] == list(range(N_FRAMES))
+    assert [frame_number(frame) for _, _, frame in got] == list(range(N_FRAMES))
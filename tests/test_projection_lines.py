@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "video", "video_analysis"))
+
+from projection_lines import (  # noqa: E402
+    detect_frets_projection,
+    detect_strings_projection,
+    synthetic_fretboard,
+)
+
+
+def test_peaks_at_line_centers_without_noise():
+    img, xs, ys = synthetic_fretboard(noise=0)
+
+    found_x = [f.x for f in detect_frets_projection(img)]
+    found_y = [s.y for s in detect_strings_projection(img)]
+
+    assert found_x == list(xs)
+    assert found_y == list(ys)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_one_peak_per_line_with_noise(seed):
+    img, xs, ys = synthetic_fretboard(noise=8, seed=seed)
+
+    found_x = np.array([f.x for f in detect_frets_projection(img)])
+
+    # Sem duplicatas (uma por borda) e cada traste a até 2 px
+    assert len(found_x) == len(xs)
+    assert np.abs(found_x - xs).max() <= 2
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "video", "video_analysis"))
+
+from detection_log import DetectionLog  # noqa: E402
+from fretboard_detectors import ReplayDetector  # noqa: E402
+
+
+def test_replay_keeps_misses_and_fills_unlogged_frames(tmp_path):
+    path = str(tmp_path / "detections.csv")
+    log = DetectionLog(path, video_hash="abc")
+    log.record(0, (10, 10, 50, 30), 0.9, "live")
+    log.record_miss(15, "live")
+    log.record(30, (12, 11, 52, 31), 0.8, "live")
+    log.flush()
+
+    replay = ReplayDetector(path, video_hash="abc")
+    out = replay.detect_batch([None] * 4, [0, 15, 20, 29])
+
+    assert out[0].bbox == (10, 10, 50, 30)
+    assert out[1] is None                       # registrado sem detecção
+    assert out[2].bbox == (12, 11, 52, 31)      # não consultado: mais próximo
+    assert out[3].bbox == (12, 11, 52, 31)
+
+
+def test_replay_requires_video_hash_for_shared_log():
+    with pytest.raises(ValueError):
+        ReplayDetector()